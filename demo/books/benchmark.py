@@ -0,0 +1,134 @@
+'''
+Benchmarks of plain QuerySet, PreparedQuerySet.execute and raw cursor for demo models
+'''
+from time import perf_counter
+from django import get_version
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.test.utils import override_settings
+from django_prepared_query import BindParam, BindArray
+from django_prepared_query.metrics import statement_metrics
+from django_prepared_query.statements_pool import compiled_statements_cache
+from .models import Book, Publisher
+
+# Params sets passed to a single execute_many call
+BATCH_SIZE = 10
+
+class BenchmarkCase:
+    '''
+    Same query built with QuerySet and PreparedQuerySet. queryset and params are functions,
+    so they are called after database is filled.
+    '''
+    def __init__(self, name, queryset, prepared_queryset, params):
+        self.name = name
+        self.queryset = queryset
+        self.prepared_queryset = prepared_queryset
+        self.params = params
+
+
+CASES = [
+    BenchmarkCase(
+        'publisher_by_pk',
+        lambda pk: Publisher.objects.filter(pk=pk),
+        lambda: Publisher.prepared_objects.filter(pk=BindParam('pk')),
+        lambda: {'pk': Publisher.objects.values_list('pk', flat=True).first()},
+    ),
+    BenchmarkCase(
+        'books_by_author_age',
+        lambda author_age, min_pages, max_pages: Book.objects.select_related('publisher').filter(
+            authors__age=author_age).filter(pages__gte=min_pages, pages__lte=max_pages),
+        lambda: Book.prepared_objects.select_related('publisher').filter(authors__age=BindParam('author_age')).filter(
+            pages__gte=BindParam('min_pages'), pages__lte=BindParam('max_pages')),
+        lambda: {'author_age': 25, 'min_pages': 100, 'max_pages': 1000},
+    ),
+    BenchmarkCase(
+        'books_in_ids',
+        lambda ids: Book.objects.filter(id__in=ids),
+        lambda: Book.prepared_objects.filter(id__in=BindArray('ids', 64)),
+        lambda: {'ids': list(Book.objects.values_list('pk', flat=True)[:50])},
+    ),
+]
+
+
+def measure(func, iterations):
+    '''
+    Runs func iterations times and returns latency in microseconds and throughput in calls per second
+    '''
+    timings = []
+    for _ in range(iterations):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    timings.sort()
+    total = sum(timings)
+    return {
+        'iterations': iterations,
+        'mean_us': total / iterations * 1e6,
+        'median_us': timings[iterations // 2] * 1e6,
+        'p95_us': timings[min(int(iterations * 0.95), iterations - 1)] * 1e6,
+        'min_us': timings[0] * 1e6,
+        'throughput': iterations / total if total else None,
+    }
+
+
+def run_raw(connection, sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def prepare_cold(case):
+    compiled_statements_cache.clear()
+    return case.prepared_queryset().prepare(eager=False)
+
+
+def measure_phases(prepared_qs, params, iterations):
+    '''
+    Runs execute iterations times with statement metrics and returns mean time of its phases in microseconds
+    '''
+    statement_metrics.reset()
+    with override_settings(PREPARED_STATEMENTS_METRICS=True):
+        for _ in range(iterations):
+            prepared_qs.execute(**params)
+    snapshot = statement_metrics.snapshot()
+    statement_metrics.reset()
+    phases = {'bind': 'bind_time', 'database': 'db_time', 'materialization': 'materialize_time'}
+    return {phase: sum(metrics[attr] for metrics in snapshot.values()) / iterations * 1e6
+            for phase, attr in phases.items()}
+
+
+def run_case(case, iterations, using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    params = case.params()
+    sql, sql_params = case.queryset(**params).query.sql_with_params()
+    prepared_qs = case.prepared_queryset().prepare(eager=False)
+    rows = prepared_qs.execute(**params)  # prepare statement on the current connection
+    return {
+        'rows': len(rows),
+        'latency': {
+            'orm': measure(lambda: list(case.queryset(**params)), iterations),
+            'prepared': measure(lambda: prepared_qs.execute(**params), iterations),
+            'prepared_many': measure(lambda: prepared_qs.execute_many([params] * BATCH_SIZE), iterations),
+            'raw': measure(lambda: run_raw(connection, sql, sql_params), iterations),
+        },
+        'prepare': {
+            'cold': measure(lambda: prepare_cold(case), iterations),
+            'cached': measure(lambda: case.prepared_queryset().prepare(eager=False), iterations),
+        },
+        'phases': measure_phases(prepared_qs, params, iterations),
+        'overhead': {
+            'orm_compile': measure(lambda: case.queryset(**params).query.get_compiler(using).as_sql(), iterations),
+        },
+    }
+
+
+def run_benchmarks(iterations=1000, cases=None, using=DEFAULT_DB_ALIAS):
+    '''
+    Runs cases for the current data in database and returns results that can be dumped to JSON
+    '''
+    cases = [case for case in CASES if cases is None or case.name in cases]
+    return {
+        'vendor': connections[using].vendor,
+        'django': get_version(),
+        'books': Book.objects.count(),
+        'cases': {case.name: run_case(case, iterations, using) for case in cases},
+    }
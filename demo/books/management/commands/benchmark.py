@@ -0,0 +1,31 @@
+import json
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from books.benchmark import CASES, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Compares QuerySet, PreparedQuerySet and raw cursor performance and writes results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000],
+                            help='Number of books for each run, database is refilled before each of them')
+        parser.add_argument('--no-fill', action='store_true', help='Run once for existing data')
+        parser.add_argument('--iterations', type=int, default=1000)
+        parser.add_argument('--case', dest='cases', action='append', choices=[case.name for case in CASES])
+        parser.add_argument('--output', help='File for JSON results, stdout by default')
+
+    def handle(self, *args, **options):
+        results = []
+        if options['no_fill']:
+            results.append(run_benchmarks(options['iterations'], options['cases']))
+        else:
+            for size in options['sizes']:
+                call_command('fill_db', books=size, clear=True)
+                results.append(run_benchmarks(options['iterations'], options['cases']))
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
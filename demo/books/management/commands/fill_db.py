@@ -5,7 +5,25 @@ from books.models import Book, Author, Publisher
 
 
 class Command(BaseCommand):
+    help = 'Fills database with random publishers, authors and books'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000, help='Number of books')
+        parser.add_argument('--authors', type=int, help='Number of authors, 5% of books by default')
+        parser.add_argument('--publishers', type=int, help='Number of publishers, 1.5% of books by default')
+        parser.add_argument('--clear', action='store_true', help='Delete existing data before filling')
+
     def handle(self, *args, **options):
-        publishers = mixer.cycle(15).blend(Publisher)
-        authors = mixer.cycle(50).blend(Author, age=(i for i in range(20, 70)))
-        books = mixer.cycle(1000).blend(Book, pubdate=datetime.now(), authors=mixer.RANDOM, publisher=mixer.SELECT)
+        books_count = options['books']
+        authors_count = options['authors'] or max(books_count // 20, 1)
+        publishers_count = options['publishers'] or max(books_count * 3 // 200, 1)
+        if books_count < 1:
+            raise CommandError('Number of books should be positive')
+        if options['clear']:
+            Book.objects.all().delete()
+            Author.objects.all().delete()
+            Publisher.objects.all().delete()
+        publishers = mixer.cycle(publishers_count).blend(Publisher)
+        authors = mixer.cycle(authors_count).blend(Author, age=(20 + i % 50 for i in range(authors_count)))
+        books = mixer.cycle(books_count).blend(Book, pubdate=datetime.now(), authors=mixer.RANDOM,
+                                               publisher=mixer.SELECT)
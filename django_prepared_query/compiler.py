@@ -1,11 +1,48 @@
 from hashlib import md5
-from django.db.models.sql.compiler import SQLCompiler
+from itertools import repeat, chain
+from time import perf_counter
+from django import get_version
+from django.db.models.query import get_related_populators
+from django.db.models.sql.compiler import SQLCompiler, SQLInsertCompiler, SQLUpdateCompiler, SQLDeleteCompiler, \
+    cursor_iter
+from django.db.models.sql.constants import MULTI, CURSOR, GET_ITERATOR_CHUNK_SIZE
 from django.db.models import AutoField, BigAutoField, IntegerField, BigIntegerField
 from .operations import PreparedOperationsFactory
-from .params import BindParam
+from .params import BindParam, ParamsBinder
+from .exceptions import PreparedStatementException
+from .statements_pool import statements_pool, compiled_statements_cache, PreparedStatement
+from .utils import get_query_fingerprint
 
 
-class PrepareSQLCompiler(SQLCompiler):
+DJANGO_2 = get_version().startswith('2')
+
+
+def get_plan_mode_sql(connection, prepared_operations, plan_mode):
+    '''
+    Returns sql that sets plan cache mode of statement for execute. Mode is set only for transaction of execute,
+    so in autocommit mode it ends with execute query. In transaction statements without plan mode restore default
+    mode until transaction ends, it's marked before execute, because extra restore doesn't change anything.
+    '''
+    statements = statements_pool[connection]
+    if plan_mode is None:
+        if not statements.plan_mode_set:
+            return ''
+        if connection.get_autocommit():  # Transaction that set mode is finished
+            statements.plan_mode_set = False
+            return ''
+    elif not connection.get_autocommit():
+        statements.plan_mode_set = True
+    return prepared_operations.plan_mode_sql(plan_mode)
+
+
+class PrepareCompilerMixin:
+    '''
+    Compiles query to prepare statement, execute_sql prepares statement for the current connection
+    '''
+    def __init__(self, query, connection, using):
+        super(PrepareCompilerMixin, self).__init__(query, connection, using)
+        self.prepared_operations = PreparedOperationsFactory.create(self.connection.vendor)
+
     def _generate_statement_name(self, sql):
         sql_hash = md5(sql.encode()).hexdigest()
         model_name = self.query.model._meta.model_name
@@ -13,34 +50,34 @@ class PrepareSQLCompiler(SQLCompiler):
         self.query.prepare_statement_name = name
         return name
 
-    def as_sql(self, with_limits=True, with_col_aliases=False):
-        """
-        Because Django expects that low_mark and high_mark are numbers and it can be BindParam
-        instead of number we temporary change limit BindParams to number, compile to sql using
-        standard Django as_sql method and then change it back to BindParams.
-        """
-        query = self.query
-        high_mark, low_mark = query.high_mark, query.low_mark
-        is_high_mark_bind_param = isinstance(high_mark, BindParam)
-        is_low_mark_bind_param = isinstance(low_mark, BindParam)
-        if is_high_mark_bind_param:
-            query.high_mark = 2 if low_mark else 1
-        if is_low_mark_bind_param:
-            query.low_mark = 1
-        result_sql, params = super(PrepareSQLCompiler, self).as_sql(with_limits, with_col_aliases)
-        params = list(params)
-        if is_high_mark_bind_param:
-            result_sql = result_sql.replace('LIMIT 1', 'LIMIT {}')
-            params.append(high_mark.hash)
-        if is_low_mark_bind_param:
-            result_sql = result_sql.replace('OFFSET 1', 'OFFSET {}')
-            params.append(low_mark.hash)
-        query.high_mark, query.low_mark = high_mark, low_mark
-        return result_sql, tuple(params)
+    def _get_cache_key(self):
+        fingerprint = get_query_fingerprint(self.query)
+        if fingerprint is None:
+            return None
+        return self.connection.alias, fingerprint
+
+    def _set_cached_statement(self, statement):
+        '''
+        Set compiled statement from cache, cache stores params by names because hashes are unique for each query
+        '''
+        name, sql, fixed_sql_params, params_names, cursor_statement = statement
+        hashes_by_name = {param.name: param_hash for param_hash, param in self.query.prepare_params_by_hash.items()}
+        self.query.set_prepare_statement_name(name)
+        self.query.set_prepare_statement_sql(sql, fixed_sql_params)
+        self.query.set_prepare_cursor_statement(cursor_statement)
+        self.query.set_prepare_params_order([hashes_by_name[param_name] for param_name in params_names])
+        return sql, fixed_sql_params
 
     def prepare_sql(self):
         if self.query.prepare_statement_sql:
             return self.query.prepare_statement_sql, self.query.prepare_statement_sql_params
+        self.query.set_prepare_params_sizes({param_hash: prepare_param.size for param_hash, prepare_param
+                                             in self.query.prepare_params_by_hash.items()})
+        cache_key = self._get_cache_key()
+        if cache_key is not None:
+            statement = compiled_statements_cache.get(cache_key)
+            if statement:
+                return self._set_cached_statement(statement)
         sql, params = self.as_sql()
         name = self._generate_statement_name(sql)
         arguments = []
@@ -56,55 +93,201 @@ class PrepareSQLCompiler(SQLCompiler):
                 elif isinstance(field, AutoField):
                     field = IntegerField()
                 db_type = field.db_type(self.connection)
-                for _ in range(prepare_param.size):
-                    arguments.append(db_type)
+                if getattr(prepare_param, 'array', False):
+                    if not self.prepared_operations.has_array_params():
+                        raise PreparedStatementException(
+                            'Array parameters aren\'t supported for %s' % self.connection.vendor)
+                    arguments.append('%s[]' % db_type)
+                else:
+                    arguments.extend(repeat(db_type, prepare_param.size))
                 prepare_params_ordered.append(prepare_param_hash)
                 break
             else:
                 fixed_sql_params.append(param)
-        prepared_operations = PreparedOperationsFactory.create(self.connection.vendor)
+        prepared_operations = self.prepared_operations
         prepare_statement = prepared_operations.prepare_sql(name=name,
                                                             arguments=arguments, sql=sql)
         placeholders = tuple(prepared_operations.prepare_placeholder(i) for i in range(1, len(arguments) + 1))
         sql_with_placeholders = prepare_statement.format(*placeholders)
+        cursor_statement = None
+        if prepared_operations.has_cursor_statement():
+            cursor_statement = prepared_operations.compile_statement(sql.format(*placeholders), fixed_sql_params)
         self.query.set_prepare_statement_sql(sql_with_placeholders, fixed_sql_params)
+        self.query.set_prepare_cursor_statement(cursor_statement)
         self.query.set_prepare_params_order(prepare_params_ordered)
+        if cache_key is not None:
+            params_names = [self.query.prepare_params_by_hash[param_hash].name for param_hash in prepare_params_ordered]
+            compiled_statements_cache.set(cache_key, (name, sql_with_placeholders, fixed_sql_params, params_names,
+                                                      cursor_statement))
         return sql_with_placeholders, fixed_sql_params
 
     def execute_sql(self, *args, **kwargs):
+        '''
+        Prepares statement for the current connection and returns statement that should be stored in pool
+        '''
+        sql, params = self.prepare_sql()
+        if not self.prepared_operations.has_server_prepare():
+            self.connection.ensure_connection()
+            return self.get_statement(*self.prepared_operations.compile_statement(sql, params))
+        warmup = self.get_warmup_sql()
         with self.connection.cursor() as cursor:
-            sql, params = self.prepare_sql()
-            cursor.execute(sql, params)
-            return cursor
+            if warmup is None:
+                cursor.execute(sql, params)
+            else:
+                cursor.execute(sql + warmup[0], tuple(params) + warmup[1])
+        return self.get_statement(sql, params)
+
+    def get_warmup_sql(self):
+        '''
+        Returns sql that executes statement with warm-up params enough times to let database switch it
+        to generic plan, or None if statement doesn't have warm-up params
+        '''
+        params = self.query.prepare_warmup_params
+        if params is None:
+            return None
+        prepared_operations = self.prepared_operations
+        executes = prepared_operations.CUSTOM_PLANS_COUNT
+        plan_mode_sql = get_plan_mode_sql(self.connection, prepared_operations, self.query.prepare_plan_mode)
+        execute_sql = prepared_operations.execute_sql(name=self.query.prepare_statement_name, arguments=params)
+        return plan_mode_sql + execute_sql * executes, tuple(params) * executes
+
+    def get_statement(self, sql, params):
+        deallocate_sql = self.prepared_operations.deallocate_sql(self.query.prepare_statement_name)
+        return PreparedStatement(sql, params, deallocate_sql)
+
+
+class PrepareSQLCompiler(PrepareCompilerMixin, SQLCompiler):
+    def as_sql(self, with_limits=True, with_col_aliases=False):
+        """
+        Because Django expects that low_mark and high_mark are numbers and it can be BindParam
+        instead of number we temporary change limit BindParams to number, compile to sql using
+        standard Django as_sql method and then change it back to BindParams.
+        """
+        query = self.query
+        high_mark, low_mark = query.high_mark, query.low_mark
+        is_high_mark_bind_param = isinstance(high_mark, BindParam)
+        is_low_mark_bind_param = isinstance(low_mark, BindParam)
+        if is_high_mark_bind_param:
+            query.high_mark = 2 if low_mark else 1
+        if is_low_mark_bind_param:
+            query.low_mark = 1
+        result_sql, params = super(PrepareSQLCompiler, self).as_sql(with_limits, with_col_aliases)
+        params = list(params)
+        if is_high_mark_bind_param:
+            result_sql = result_sql.replace('LIMIT 1', 'LIMIT {}')
+            params.append(high_mark.hash)
+        if is_low_mark_bind_param:
+            result_sql = result_sql.replace('OFFSET 1', 'OFFSET {}')
+            params.append(low_mark.hash)
+        query.high_mark, query.low_mark = high_mark, low_mark
+        return result_sql, tuple(params)
+
+
+class PrepareSQLUpdateCompiler(PrepareCompilerMixin, SQLUpdateCompiler):
+    pass
+
+
+class PrepareSQLDeleteCompiler(PrepareCompilerMixin, SQLDeleteCompiler):
+    pass
+
+
+class PrepareSQLInsertCompiler(PrepareCompilerMixin, SQLInsertCompiler):
+    def __init__(self, query, connection, using):
+        super(PrepareSQLInsertCompiler, self).__init__(query, connection, using)
+        self.return_id = query.return_id
+
+    def as_sql(self):
+        statements = super(PrepareSQLInsertCompiler, self).as_sql()
+        if len(statements) != 1:
+            raise PreparedStatementException('Multi-row insert isn\'t supported for %s' % self.connection.vendor)
+        return statements[0]
 
 
 class ExecutePreparedSQLCompiler(SQLCompiler):
     def __init__(self, query, connection, using):
         super(ExecutePreparedSQLCompiler, self).__init__(query, connection, using)
         self.prepared_operations = PreparedOperationsFactory.create(self.connection.vendor)
+        self.fetched_rows = None
+        self.converters = None
+        self.model_layout = None
+        self.execution_timer = None
+
+    def setup_execute_metadata(self):
+        '''
+        Computes select, converters and model init layout once on prepare, so execute only runs statement
+        and builds instances
+        '''
+        self.pre_sql_setup()
+        self.converters = self.get_converters([s[0] for s in self.select[0:self.col_count]])
+        klass_info = self.klass_info
+        if klass_info is None:
+            return
+        select_fields = klass_info['select_fields']
+        model_fields_start, model_fields_end = select_fields[0], select_fields[-1] + 1
+        init_list = [f[0].target.attname for f in self.select[model_fields_start:model_fields_end]]
+        related_populators = get_related_populators(klass_info, self.select, self.using)
+        annotations = tuple((self.annotation_col_map or {}).items())
+        self.model_layout = (klass_info['model'], init_list, model_fields_start, model_fields_end,
+                             related_populators, annotations)
+
+    def create_instance(self, row):
+        '''
+        Creates model instance from converted row using layout computed on prepare
+        '''
+        model_cls, init_list, model_fields_start, model_fields_end, related_populators, annotations = \
+            self.model_layout
+        obj = model_cls.from_db(self.using, init_list, row[model_fields_start:model_fields_end])
+        for rel_populator in related_populators:
+            rel_populator.populate(row, obj)
+        for attr_name, col_pos in annotations:
+            setattr(obj, attr_name, row[col_pos])
+        return obj
+
+    def results_iter(self, results=None, tuple_expected=False, chunked_fetch=False,
+                     chunk_size=GET_ITERATOR_CHUNK_SIZE):
+        if not DJANGO_2 or self.converters is None:
+            return super(ExecutePreparedSQLCompiler, self).results_iter(results, tuple_expected,
+                                                                       chunked_fetch, chunk_size)
+        if results is None:
+            results = self.execute_sql(MULTI, chunked_fetch=chunked_fetch, chunk_size=chunk_size)
+        rows = chain.from_iterable(results)
+        if self.converters:
+            rows = self.apply_converters(rows, self.converters)
+            if tuple_expected:
+                rows = map(tuple, rows)
+        return rows
+
+    def get_params_binder(self):
+        # Drivers of backends without server side prepare can't adapt python values by themselves
+        adapt_values = not self.prepared_operations.has_server_prepare()
+        return ParamsBinder(self.query, self.connection, adapt_values)
 
     def get_query_params(self):
-        prepare_params_values = self.query.prepare_params_values
-        params = []
-        for param_hash in self.query.prepare_params_order:
-            prepare_param = self.query.prepare_params_by_hash[param_hash]
-            values = prepare_params_values[prepare_param.name]
-            if prepare_param.size > 1:
-                params.extend(values)
-            else:
-                params.append(values)
-        return params
+        return self.query.prepare_params
 
     def as_sql(self, with_limits=True, with_col_aliases=False):
         params = self.get_query_params()
+        if not self.prepared_operations.has_server_prepare():
+            statement = statements_pool[self.connection][self.query.prepare_statement_name]
+            return statement.sql, self.prepared_operations.bind_params(statement.params, params)
         execute_statement = self.prepared_operations.execute_sql(name=self.query.prepare_statement_name,
                                                                  arguments=params)
+        if self.prepared_operations.PLAN_MODES:
+            execute_statement = get_plan_mode_sql(self.connection, self.prepared_operations,
+                                                  self.query.prepare_plan_mode) + execute_statement
         params = params if params and not self.prepared_operations.has_setup() else ()
         return execute_statement, params
 
-    def setup_execute_sql(self):
+    def get_cursor_sql(self):
+        sql, layout = self.query.prepare_cursor_statement
+        return sql, self.prepared_operations.bind_params(layout, self.get_query_params())
+
+    def get_setup_sql(self):
         params = self.get_query_params()
-        setup_sql = self.prepared_operations.setup_execute_sql(params)
+        return self.prepared_operations.setup_execute_sql(params), params
+
+    def setup_execute_sql(self):
+        setup_sql, params = self.get_setup_sql()
         if not setup_sql:
             return
         cursor = self.connection.cursor()
@@ -117,7 +300,130 @@ class ExecutePreparedSQLCompiler(SQLCompiler):
                 pass
             raise original_exception
 
-    def execute_sql(self, *args, **kwargs):
+    def execute_chunked_sql(self, chunk_size=GET_ITERATOR_CHUNK_SIZE):
+        '''
+        Runs statement with server side cursor and returns iterator over chunks of rows,
+        so rows are fetched from database only while iterating
+        '''
+        if self.prepared_operations.has_cursor_statement():
+            sql, params = self.get_cursor_sql()
+        else:
+            sql, params = self.as_sql()
+        cursor = self.prepared_operations.chunked_cursor(self.connection)
+        try:
+            cursor.execute(sql, params)
+        except Exception as original_exception:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            raise original_exception
+        result = cursor_iter(cursor, self.connection.features.empty_fetchmany_value,
+                             self.col_count if self.has_extra_select else None, chunk_size)
+        if not self.connection.features.can_use_chunked_reads:
+            return list(result)
+        return result
+
+    def execute_many_sql(self, params_values_list):
+        '''
+        Runs statement for each params values and returns list of fetched rows for each of them.
+        Operations that support batching send all statements in a single round trip.
+        '''
+        statements = []
+        for params_values in params_values_list:
+            self.query.set_prepare_params_values(params_values)
+            statement = []
+            if self.prepared_operations.has_setup():
+                setup_sql, params = self.get_setup_sql()
+                if setup_sql:
+                    statement.append((setup_sql, params))
+            statement.append(self.as_sql())
+            statements.append(statement)
+        if not statements:
+            return []
+        timer = self.execution_timer
+        if timer is not None:
+            timer.lap('bind_time')
+        started = perf_counter()
+        cursor = self.connection.cursor()
+        try:
+            with self.connection.wrap_database_errors:
+                results = self.prepared_operations.execute_many(cursor, statements)
+        finally:
+            cursor.close()
+            if timer is not None:
+                timer.db_time += perf_counter() - started
+        if self.has_extra_select:
+            results = [[row[:self.col_count] for row in rows] for rows in results]
+        return results
+
+    def get_explain_sql(self, analyze=False):
+        '''
+        Returns sql that explains plan used by statement for bound params. Statements prepared with PREPARE command
+        are explained with EXECUTE, so plan is the one cached by database for statement.
+        '''
+        options = {'analyze': True} if analyze else {}
+        prefix = self.connection.ops.explain_query_prefix(**options)
+        prepared_operations = self.prepared_operations
+        if not prepared_operations.has_server_prepare():
+            sql, params = self.as_sql()
+            return '%s %s' % (prefix, sql), params
+        if not prepared_operations.has_explain_execute():
+            raise PreparedStatementException('Explain of prepared statement isn\'t supported for %s' %
+                                             self.connection.vendor)
+        params = self.get_query_params()
+        explain_sql = prepared_operations.explain_sql(prefix, self.query.prepare_statement_name, params)
+        if prepared_operations.PLAN_MODES:
+            explain_sql = get_plan_mode_sql(self.connection, prepared_operations,
+                                            self.query.prepare_plan_mode) + explain_sql
+        return explain_sql, params
+
+    def explain_sql(self, analyze=False):
+        '''
+        Runs explain of statement and returns plan in the same format as QuerySet.explain
+        '''
+        sql, params = self.get_explain_sql(analyze)
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+    def execute_rowcount_sql(self):
+        '''
+        Runs update or delete statement and returns number of affected rows
+        '''
+        cursor = self.execute_sql(CURSOR)
+        try:
+            return cursor.rowcount if cursor else 0
+        finally:
+            if cursor:
+                cursor.close()
+
+    def set_fetched_rows(self, rows):
+        '''
+        Rows that will be returned by the next execute_sql call instead of running statement
+        '''
+        self.fetched_rows = rows
+
+    def execute_sql(self, result_type=MULTI, chunked_fetch=False, chunk_size=GET_ITERATOR_CHUNK_SIZE):
+        if self.fetched_rows is not None:
+            rows, self.fetched_rows = self.fetched_rows, None
+            return [rows]
+        timer = self.execution_timer
+        if timer is None:
+            return self._execute_sql(result_type, chunked_fetch, chunk_size)
+        # Chunked fetch time is counted as materialization, because rows are fetched while iterating
+        started = perf_counter()
+        try:
+            return self._execute_sql(result_type, chunked_fetch, chunk_size)
+        finally:
+            timer.db_time += perf_counter() - started
+
+    def _execute_sql(self, result_type, chunked_fetch, chunk_size):
         if self.prepared_operations.has_setup():
             self.setup_execute_sql()
-        return super(ExecutePreparedSQLCompiler, self).execute_sql(*args, **kwargs)
+        if chunked_fetch and result_type == MULTI:
+            return self.execute_chunked_sql(chunk_size)
+        if DJANGO_2:
+            return super(ExecutePreparedSQLCompiler, self).execute_sql(result_type, chunked_fetch, chunk_size)
+        return super(ExecutePreparedSQLCompiler, self).execute_sql(result_type, chunked_fetch)
@@ -0,0 +1,102 @@
+from itertools import chain
+from types import SimpleNamespace
+from django.db import connections
+from django.db.models.sql.constants import MULTI
+from .query import PrepareInsertQuery
+from .queryset import PreparedQuerySet
+from .params import BindParam
+from .result_cache import invalidate_written_tables
+from .exceptions import PreparedStatementException
+
+
+class PreparedInsert:
+    '''
+    Inserts objects with prepared multi-row INSERT statements. Full batches use statement for batch_size rows
+    and remainder uses statement prepared for its size.
+    '''
+    def __init__(self, model, fields, batch_size=100, returning=False, using=None):
+        opts = model._meta
+        if opts.parents:
+            raise PreparedStatementException('Insert can\'t be prepared for multi-table inherited model')
+        self.model = model
+        self.fields = [opts.get_field(field) if isinstance(field, str) else field for field in fields]
+        self.using = using
+        connection = connections[using]
+        if returning and not connection.features.can_return_ids_from_bulk_insert:
+            raise PreparedStatementException('Returning primary keys isn\'t supported for %s' % connection.vendor)
+        self.returning = returning
+        max_batch_size = connection.ops.bulk_batch_size(self.fields, [None] * batch_size)
+        self.batch_size = max(min(batch_size, max_batch_size), 1)
+        self._statements = {}
+        self._get_statement(self.batch_size)
+
+    def _get_statement(self, size):
+        '''
+        Returns prepared queryset and params positions for insert of size rows
+        '''
+        statement = self._statements.get(size)
+        if statement is not None:
+            return statement
+        query = PrepareInsertQuery(self.model)
+        query.return_id = self.returning
+        objs = []
+        positions = {}
+        for row in range(size):
+            obj = SimpleNamespace()
+            for column, field in enumerate(self.fields):
+                prepare_param = BindParam('%s_%d' % (field.attname, row))
+                prepare_param.field_type = field
+                query.add_prepare_param(prepare_param)
+                setattr(obj, field.attname, prepare_param)
+                positions[prepare_param.name] = row * len(self.fields) + column
+            objs.append(obj)
+        query.insert_values(self.fields, objs, raw=True)
+        qs = PreparedQuerySet(model=self.model, query=query, using=self.using)
+        qs._for_write = True
+        qs._written_tables = (self.model._meta.db_table,)
+        qs.prepare()
+        prepare_params = qs.query.prepare_params_by_hash
+        statement = qs, [positions[prepare_params[param_hash].name] for param_hash in qs.query.prepare_params_order]
+        self._statements[size] = statement
+        return statement
+
+    def _insert_batch(self, objs):
+        qs, positions = self._get_statement(len(objs))
+        connection = connections[qs.db]
+        values = []
+        for obj in objs:
+            for field in self.fields:
+                value = field.pre_save(obj, add=True)
+                if hasattr(value, 'resolve_expression'):
+                    raise PreparedStatementException('Expressions can\'t be inserted with prepared statement')
+                values.append(field.get_db_prep_save(value, connection=connection))
+        qs._execute_prepare()
+        query = qs.query.bind(qs.db, params=[values[position] for position in positions])
+        compiler = query.get_compiler(qs.db)
+        if self.returning:
+            rows = chain.from_iterable(compiler.execute_sql(MULTI))
+            for obj, row in zip(objs, rows):
+                obj.pk = row[0]
+        else:
+            compiler.execute_rowcount_sql()
+        for obj in objs:
+            obj._state.adding = False
+            obj._state.db = qs.db
+        invalidate_written_tables(qs._written_tables, qs.db)
+        return len(objs)
+
+    def execute(self, objs):
+        '''
+        Inserts objects from iterable in batches and returns number of inserted rows.
+        With returning primary keys are set to inserted objects.
+        '''
+        inserted = 0
+        batch = []
+        for obj in objs:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                inserted += self._insert_batch(batch)
+                batch = []
+        if batch:
+            inserted += self._insert_batch(batch)
+        return inserted
@@ -0,0 +1,13 @@
+from django.db.models.lookups import In
+
+
+class ArrayIn(In):
+    '''
+    In lookup with array BindArray, all values are passed as a single array parameter
+    '''
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = compiler.compile(self.rhs)
+        field = self.rhs.field_type or self.lhs.output_field
+        rhs_sql = '%s::%s[]' % (rhs_sql, field.rel_db_type(connection))
+        return '%s = ANY(%s)' % (lhs_sql, rhs_sql), list(lhs_params) + list(rhs_params)
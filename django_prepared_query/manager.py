@@ -1,6 +1,13 @@
+from django.db import router
 from django.db.models.manager import BaseManager
 from .queryset import PreparedQuerySet
+from .insert import PreparedInsert
 
 
 class PreparedManager(BaseManager.from_queryset(PreparedQuerySet)):
-    pass
+    def prepare_insert(self, fields, batch_size=100, returning=False):
+        '''
+        Prepares multi-row INSERT of fields values, returning is supported only by PostgreSQL
+        '''
+        using = self._db or router.db_for_write(self.model)
+        return PreparedInsert(self.model, fields, batch_size, returning, using)
@@ -0,0 +1,112 @@
+from threading import Lock
+from time import perf_counter
+from django.conf import settings
+from .signals import statement_prepared, statement_executed, slow_statement_executed
+
+
+def metrics_enabled():
+    return getattr(settings, 'PREPARED_STATEMENTS_METRICS', False)
+
+
+def get_slow_threshold():
+    '''
+    Returns database time in seconds for a single call above which statement is slow, None disables it
+    '''
+    return getattr(settings, 'PREPARED_STATEMENTS_SLOW_THRESHOLD', None)
+
+
+class StatementMetrics:
+    '''
+    Counters and total timings in seconds of prepared statement
+    '''
+    __slots__ = ('calls', 'prepares', 'slow_calls', 'cache_hits', 'rows', 'prepare_time', 'bind_time', 'db_time',
+                 'materialize_time')
+
+    def __init__(self):
+        for attr in self.__slots__:
+            setattr(self, attr, 0)
+
+    def as_dict(self):
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+
+class MetricsRegistry(dict):
+    '''
+    In process metrics of prepared statements by statement name, collected only with PREPARED_STATEMENTS_METRICS.
+    Counters are updated by threads under lock, signals are sent outside of it.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.lock = Lock()
+
+    def _get_metrics(self, name):
+        metrics = self.get(name)
+        if metrics is None:
+            metrics = self[name] = StatementMetrics()
+        return metrics
+
+    def record_prepare(self, name, prepare_time):
+        with self.lock:
+            metrics = self._get_metrics(name)
+            metrics.prepares += 1
+            metrics.prepare_time += prepare_time
+        statement_prepared.send(sender=self.__class__, name=name, prepare_time=prepare_time)
+
+    def record_execute(self, name, calls, rows, bind_time, db_time, materialize_time, cache_hits=0):
+        slow_threshold = get_slow_threshold()
+        is_slow = slow_threshold is not None and db_time > slow_threshold * calls
+        with self.lock:
+            metrics = self._get_metrics(name)
+            metrics.calls += calls
+            metrics.cache_hits += cache_hits
+            metrics.rows += rows
+            metrics.bind_time += bind_time
+            metrics.db_time += db_time
+            metrics.materialize_time += materialize_time
+            if is_slow:
+                metrics.slow_calls += calls
+        kwargs = {'name': name, 'calls': calls, 'rows': rows, 'bind_time': bind_time, 'db_time': db_time,
+                  'materialize_time': materialize_time, 'cache_hits': cache_hits}
+        statement_executed.send(sender=self.__class__, **kwargs)
+        if is_slow:
+            slow_statement_executed.send(sender=self.__class__, **kwargs)
+
+    def snapshot(self):
+        '''
+        Returns copy of metrics as dictionaries
+        '''
+        with self.lock:
+            return {name: metrics.as_dict() for name, metrics in self.items()}
+
+    def reset(self):
+        with self.lock:
+            self.clear()
+
+
+statement_metrics = MetricsRegistry()
+
+
+class ExecutionTimer:
+    '''
+    Measures phases of a single execute, compiler adds database time while statement runs
+    '''
+    def __init__(self, calls=1):
+        self.calls = calls
+        self.cache_hits = 0
+        self.bind_time = 0.0
+        self.prepare_time = 0.0
+        self.db_time = 0.0
+        self.last = perf_counter()
+
+    def lap(self, phase):
+        '''
+        Adds time passed since the previous lap to phase
+        '''
+        now = perf_counter()
+        setattr(self, phase, getattr(self, phase) + now - self.last)
+        self.last = now
+
+    def finish(self, name, rows):
+        materialize_time = perf_counter() - self.last - self.db_time
+        statement_metrics.record_execute(name, self.calls, rows, self.bind_time, self.db_time, materialize_time,
+                                         self.cache_hits)
@@ -1,7 +1,14 @@
+import re
 from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.operations import BaseDatabaseOperations
+from django.db.backends.utils import CursorWrapper
 
 
 class PreparedOperations:
+    PLACEHOLDER_REGEX = re.compile(r'(?<!%)%s|\?(\d+)')
+    # Plan cache modes of statement by names accepted by prepare(plan_mode=...)
+    PLAN_MODES = {}
+
     def prepare_sql(self, name, arguments, sql):
         raise NotImplementedError
 
@@ -11,15 +18,107 @@ class PreparedOperations:
     def setup_execute_sql(self, arguments):
         raise NotImplementedError
 
+    def deallocate_sql(self, name):
+        raise NotImplementedError
+
+    def explain_sql(self, prefix, name, arguments):
+        raise NotImplementedError
+
+    def plan_mode_sql(self, plan_mode):
+        raise NotImplementedError
+
     @staticmethod
     def has_setup():
         raise NotImplementedError
 
+    @staticmethod
+    def has_server_prepare():
+        return True
+
+    @staticmethod
+    def has_explain_execute():
+        return False
+
+    @staticmethod
+    def has_array_params():
+        return False
+
+    @staticmethod
+    def integer_field_range(internal_type):
+        '''
+        Returns range of integer field type that isn't validated by django field validators
+        '''
+        return None, None
+
+    @staticmethod
+    def has_cursor_statement():
+        '''
+        Server side cursor can't be declared for EXECUTE command, so it runs statement sql compiled on prepare
+        '''
+        return False
+
+    def chunked_cursor(self, connection):
+        '''
+        Returns cursor that fetches rows from database in chunks while iterating
+        '''
+        return connection.chunked_cursor()
+
+    def prepare_many(self, cursor, statements):
+        '''
+        Runs list of prepare (sql, params) pairs in a single query
+        '''
+        sql = ''.join(sql for sql, params in statements)
+        params = [param for sql, params in statements for param in params]
+        cursor.execute(sql, params)
+
+    def execute_many(self, cursor, statements):
+        '''
+        Runs list of statements, each of them is list of (sql, params) pairs and last one returns rows.
+        Returns fetched rows for each statement.
+        '''
+        results = []
+        for statement in statements:
+            for sql, params in statement:
+                cursor.execute(sql, params)
+            results.append(cursor.fetchall())
+        return results
+
+    def compile_statement(self, sql, params):
+        '''
+        Replaces all placeholders with standard ones and returns sql with params layout,
+        that contains argument index for bind params and value for fixed params.
+        '''
+        fixed_params = iter(params)
+        layout = []
+
+        def replace_placeholder(match):
+            argument_number = match.group(1)
+            if argument_number:
+                layout.append((True, int(argument_number) - 1))
+            else:
+                layout.append((False, next(fixed_params)))
+            return '%s'
+
+        sql = self.PLACEHOLDER_REGEX.sub(replace_placeholder, sql)
+        return sql, tuple(layout)
+
+    def bind_params(self, layout, arguments):
+        return [arguments[value] if is_argument else value for is_argument, value in layout]
+
     def prepare_placeholder(self, index):
         raise NotImplementedError
 
 
 class PostgresqlPreparedOperations(PreparedOperations):
+    PLACEHOLDER_REGEX = re.compile(r'(?<!%)%s|\$(\d+)')
+    PLAN_MODES = {
+        'auto': 'auto',
+        'generic': 'force_generic_plan',
+        'custom': 'force_custom_plan',
+    }
+    # Number of executes planned with custom plans before PostgreSQL considers generic plan
+    CUSTOM_PLANS_COUNT = 5
+
     def prepare_sql(self, name, arguments, sql):
         arguments_sql = ''
         if arguments:
@@ -32,10 +131,33 @@ class PostgresqlPreparedOperations(PreparedOperations):
             arguments_sql = '(%s)' % ','.join('%s' for _ in range(len(arguments)))
         return 'EXECUTE %s%s;' % (name, arguments_sql)
 
+    def deallocate_sql(self, name):
+        return 'DEALLOCATE %s;' % name
+
+    def explain_sql(self, prefix, name, arguments):
+        return '%s %s' % (prefix, self.execute_sql(name, arguments))
+
+    def plan_mode_sql(self, plan_mode):
+        if plan_mode is None:
+            return 'SET LOCAL plan_cache_mode = DEFAULT;'
+        return 'SET LOCAL plan_cache_mode = %s;' % self.PLAN_MODES[plan_mode]
+
     @staticmethod
     def has_setup():
         return False
 
+    @staticmethod
+    def has_explain_execute():
+        return True
+
+    @staticmethod
+    def has_array_params():
+        return True
+
+    @staticmethod
+    def has_cursor_statement():
+        return True
+
     def setup_execute_sql(self, arguments):
         return None
 
@@ -57,6 +179,9 @@ class MySqlPreparedOperations(PreparedOperations):
             execute_sql = '%s USING %s' % (execute_sql, arguments_sql)
         return execute_sql + ';'
 
+    def deallocate_sql(self, name):
+        return 'DEALLOCATE PREPARE %s;' % name
+
     @staticmethod
     def has_setup():
         return True
@@ -68,6 +193,29 @@ class MySqlPreparedOperations(PreparedOperations):
         sql = 'SET %s;' % ','.join(['{} = %s'.format(name) for name in variables])
         return sql
 
+    def chunked_cursor(self, connection):
+        '''
+        Unbuffered cursor streams rows from server instead of loading the whole result set to client
+        '''
+        connection.ensure_connection()
+        cursor = connection.connection.cursor(connection.Database.cursors.SSCursor)
+        return CursorWrapper(cursor, connection)
+
+    def execute_many(self, cursor, statements):
+        '''
+        Sends all statements in a single round trip as multiple statements query
+        '''
+        sql = ''.join(sql for statement in statements for sql, params in statement)
+        params = [param for statement in statements for sql, params in statement for param in params]
+        cursor.execute(sql, params)
+        results = []
+        while True:
+            if cursor.description is not None:
+                results.append(cursor.fetchall())
+            if not cursor.nextset():
+                break
+        return results
+
     def prepare_placeholder(self, index):
         return '?'
 
@@ -76,8 +224,48 @@ class OraclePreparedOperations(PreparedOperations):
     pass
 
 
-class SqLitePreparedOperations(PreparedOperations):
-    pass
+class CompiledPreparedOperations(PreparedOperations):
+    '''
+    Base operations for backends that don't use PREPARE/EXECUTE commands. Prepare compiles statement
+    once per connection to sql and params layout, execute only binds values to compiled statement.
+    '''
+    def prepare_sql(self, name, arguments, sql):
+        return sql
+
+    def execute_sql(self, name, arguments):
+        return None
+
+    def deallocate_sql(self, name):
+        return None
+
+    @staticmethod
+    def has_setup():
+        return False
+
+    @staticmethod
+    def has_server_prepare():
+        return False
+
+    def setup_execute_sql(self, arguments):
+        return None
+
+    def prepare_placeholder(self, index):
+        return '?%d' % index
+
+
+class SqLitePreparedOperations(CompiledPreparedOperations):
+    '''
+    SQLite doesn't have PREPARE/EXECUTE commands, sqlite3 caches compiled statements by sql text,
+    so the same compiled statement is reused for every execute.
+    '''
+    # Django doesn't validate integer ranges for SQLite, so params are validated with ranges of other backends,
+    # auto fields are limited by 64-bit SQLite integers
+    INTEGER_FIELD_RANGES = dict(BaseDatabaseOperations.integer_field_ranges,
+                                AutoField=BaseDatabaseOperations.integer_field_ranges['BigIntegerField'],
+                                BigAutoField=BaseDatabaseOperations.integer_field_ranges['BigIntegerField'])
+
+    def integer_field_range(self, internal_type):
+        return self.INTEGER_FIELD_RANGES.get(internal_type, (None, None))
 
 
 class PreparedOperationsFactory:
@@ -1,7 +1,12 @@
 import random
+from copy import copy
+from functools import partial
 from itertools import repeat
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db.models import Expression, Model
+from .exceptions import PreparedStatementException, IncorrectBindParameter
+from .operations import PreparedOperationsFactory
 
 
 class BindParam(Expression):
@@ -9,6 +14,7 @@ class BindParam(Expression):
         super(BindParam, self).__init__(None)
         self.name = name
         self.field_type = field_type
+        self.validate = field_type is None
         if self.field_type:
             self.field_type.validators = []  # Disable validation for user specified field types
             if not self.field_type.max_length:
@@ -36,6 +42,9 @@ class BindParam(Expression):
             value = value._get_pk_val()
         return self.field_type.get_prep_value(value)
 
+    def get_db_prep_value(self, value, connection):
+        return self.field_type.get_db_prep_value(value, connection, prepared=True)
+
     def set_normalize_func(self, func):
         self.normalize_func = func
 
@@ -46,17 +55,127 @@ class BindParam(Expression):
 
 
 class BindArray(BindParam):
-    def __init__(self, name, size, field_type=None):
+    '''
+    List of values for in lookup. By default it's compiled to size placeholders, in array mode
+    values are passed as a single array parameter and size is optional.
+    '''
+    def __init__(self, name, size=None, field_type=None, buckets=False, array=False):
         super().__init__(name, field_type)
+        if size is None and not array:
+            raise PreparedStatementException('Size is required for %s' % name)
         self.size = size
+        self.buckets = buckets and not array
+        self.array = array
+
+    def get_bucket_size(self, total_items):
+        '''
+        Returns smallest power of two size that fits total_items, size is the biggest bucket
+        '''
+        if not self.buckets:
+            return self.size
+        bucket_size = 1
+        while bucket_size < total_items:
+            bucket_size *= 2
+        return min(bucket_size, self.size)
 
     def as_sql(self, compiler, connection):
+        if self.array:
+            return '{}', [self.hash]
         return ','.join(repeat('{}', self.size)), [self.hash]
 
     def clean(self, value):
         total_items = len(value)
-        if total_items > self.size:
+        if self.size is not None and total_items > self.size:
             raise ValidationError('%s param should have max %d items. Got %d' % (self.name, self.size, total_items))
-        cleaned_params = [self.field_type.get_prep_value(param) for param in value]
-        cleaned_params = cleaned_params + [None] * (self.size - total_items)
-        return cleaned_params
+        return [self.field_type.get_prep_value(param) for param in value]
+
+    def get_db_prep_value(self, value, connection):
+        get_db_prep_value = self.field_type.get_db_prep_value
+        return [None if item is None else get_db_prep_value(item, connection, prepared=True) for item in value]
+
+
+class ParamsBinder:
+    '''
+    Validates execute params and converts them to positional statement params.
+    It's built once per prepared statement, so execute only calls prebound cleaners and converters.
+    '''
+    def __init__(self, query, connection, adapt_values=False):
+        self.names = frozenset(query.prepare_params_names)
+        self.cleaners = []
+        integer_field_range = PreparedOperationsFactory.create(connection.vendor).integer_field_range
+        for prepare_param in query.prepare_params_by_hash.values():
+            validator = self._get_validator(prepare_param, integer_field_range)
+            self.cleaners.append((prepare_param.name, prepare_param.clean, validator))
+        self.arguments = []
+        for param_hash in query.prepare_params_order:
+            prepare_param = query.prepare_params_by_hash[param_hash]
+            adapt = partial(prepare_param.get_db_prep_value, connection=connection) if adapt_values else None
+            size = None
+            if isinstance(prepare_param, BindArray) and not prepare_param.array:
+                size = query.prepare_params_sizes[param_hash]
+            self.arguments.append((prepare_param.name, prepare_param.normalize_func, adapt, size))
+
+    @staticmethod
+    def _get_validator(prepare_param, integer_field_range):
+        field = prepare_param.field_type
+        if prepare_param.validate:
+            field = ParamsBinder._add_range_validators(field, integer_field_range)
+        if not field.validators:
+            return None
+        if isinstance(prepare_param, BindArray):
+            return lambda values: [field.run_validators(value) for value in values]
+        return field.run_validators
+
+    @staticmethod
+    def _add_range_validators(field, integer_field_range):
+        '''
+        Returns copy of field with integer range validators that backend doesn't add to model fields
+        '''
+        target_field = field.target_field if field.many_to_one or field.one_to_one else field
+        min_value, max_value = integer_field_range(target_field.get_internal_type())
+        if min_value is None and max_value is None:
+            return field
+        field = copy(field)
+        field.validators = field.validators + [MinValueValidator(min_value), MaxValueValidator(max_value)]
+        return field
+
+    def clean(self, params):
+        '''
+        Checks names and types of execute params and returns cleaned values by names
+        '''
+        if params.keys() != self.names:
+            raise IncorrectBindParameter('Incorrect params')
+        values = {}
+        for name, clean, validator in self.cleaners:
+            value = self._convert(clean, params[name], name)
+            if validator is not None:
+                validator(value)
+            values[name] = value
+        return values
+
+    @staticmethod
+    def _convert(func, value, name):
+        try:
+            return func(value)
+        except ValidationError:
+            raise
+        except Exception:
+            raise ValidationError('%s is incorrect type for %s parameter' % (value, name))
+
+    def bind(self, values):
+        '''
+        Returns positional statement params for cleaned values, arrays are padded to statement size
+        '''
+        params = []
+        for name, normalize, adapt, size in self.arguments:
+            value = values[name]
+            if normalize is not None:
+                value = normalize(value, values)
+            if adapt is not None:
+                value = self._convert(adapt, value, name)
+            if size is None:
+                params.append(value)
+            else:
+                params.extend(value)
+                params.extend(repeat(None, size - len(value)))
+        return params
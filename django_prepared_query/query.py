@@ -1,31 +1,46 @@
+from copy import copy
 from django import get_version
 from django.db import connections
 from django.db.models.sql.query import Query
-from .compiler import PrepareSQLCompiler, ExecutePreparedSQLCompiler
+from django.db.models.sql.subqueries import InsertQuery, UpdateQuery, DeleteQuery
+from .compiler import PrepareSQLCompiler, PrepareSQLInsertCompiler, PrepareSQLUpdateCompiler, \
+    PrepareSQLDeleteCompiler, ExecutePreparedSQLCompiler
 from .params import BindParam
 from .exceptions import IncorrectBindParameter
 
 
 DJANGO_2 = get_version().startswith('2')
+# Names of keyword arguments of execute methods, they can't be used as names of params
+RESERVED_PARAMS_NAMES = frozenset(('chunk_size', 'server_side', 'analyze'))
 
 
 class PrepareQuery(Query):
+    prepare_compiler = PrepareSQLCompiler
+
     def __init__(self, *args, **kwargs):
         super(PrepareQuery, self).__init__(*args, **kwargs)
         self.prepare_params_by_hash = {}
         self.prepare_params_names = set()
         self.prepare_params_order = []
+        self.prepare_params_sizes = {}
         self.prepare_statement_name = ''
         self.prepare_statement_sql = None
         self.prepare_statement_sql_params = ()
+        self.prepare_cursor_statement = None
+        self.prepare_plan_mode = None
+        self.prepare_warmup_params = None
 
     def _clone_prepared_data(self, query):
         query.prepare_params_by_hash = self.prepare_params_by_hash
         query.prepare_params_names = self.prepare_params_names
         query.prepare_params_order = self.prepare_params_order
+        query.prepare_params_sizes = self.prepare_params_sizes
         query.prepare_statement_name = self.prepare_statement_name
         query.prepare_statement_sql = self.prepare_statement_sql
         query.prepare_statement_sql_params = self.prepare_statement_sql_params
+        query.prepare_cursor_statement = self.prepare_cursor_statement
+        query.prepare_plan_mode = self.prepare_plan_mode
+        query.prepare_warmup_params = self.prepare_warmup_params
         return query
 
     def set_prepare_statement_name(self, name):
@@ -35,9 +50,21 @@ class PrepareQuery(Query):
         self.prepare_statement_sql = sql
         self.prepare_statement_sql_params = params
 
+    def set_prepare_cursor_statement(self, statement):
+        self.prepare_cursor_statement = statement
+
     def set_prepare_params_order(self, order):
         self.prepare_params_order = order
 
+    def set_prepare_params_sizes(self, sizes):
+        self.prepare_params_sizes = sizes
+
+    def set_prepare_plan_mode(self, plan_mode):
+        self.prepare_plan_mode = plan_mode
+
+    def set_prepare_warmup_params(self, params):
+        self.prepare_warmup_params = params
+
     def clone(self, *args, **kwargs):
         if DJANGO_2:
             query = super(PrepareQuery, self).clone()
@@ -51,19 +78,21 @@ class PrepareQuery(Query):
             return
         if prepare_param.name in self.prepare_params_names:
             raise IncorrectBindParameter('\'%s\' parameter used multiple times' % prepare_param.name)
+        if prepare_param.name in RESERVED_PARAMS_NAMES:
+            raise IncorrectBindParameter('\'%s\' parameter name is reserved' % prepare_param.name)
         self.prepare_params_by_hash[prepare_param.hash] = prepare_param
         self.prepare_params_names.add(prepare_param.name)
 
     def get_prepare_compiler(self, using=None, connection=None):
         '''
-        Same as get_compiler, but returns PrepareSQLCompiler.
+        Same as get_compiler, but returns compiler for prepare statement.
         get_compiler used for running normal queries created with PreparedManager.
         '''
         if using is None and connection is None:  # pragma: no cover
             raise ValueError("Need either using or connection")
         if using:
             connection = connections[using]
-        return PrepareSQLCompiler(self, connection, using)
+        return self.prepare_compiler(self, connection, using)
 
     def set_limits(self, low=None, high=None):
         is_low_bind_param = isinstance(low, BindParam)
@@ -80,19 +109,40 @@ class PrepareQuery(Query):
             self.low_mark = low
 
 
+class PrepareInsertQuery(PrepareQuery, InsertQuery):
+    prepare_compiler = PrepareSQLInsertCompiler
+    return_id = False
+
+
+class PrepareUpdateQuery(PrepareQuery, UpdateQuery):
+    prepare_compiler = PrepareSQLUpdateCompiler
+
+
+class PrepareDeleteQuery(PrepareQuery, DeleteQuery):
+    prepare_compiler = PrepareSQLDeleteCompiler
+
+
 class ExecutePreparedQuery(PrepareQuery):
     def __init__(self, *args, **kwargs):  # pragma: no cover
         super(PrepareQuery, self).__init__(*args, **kwargs)
         self.prepare_params_values = {}
+        self.prepare_params = []
+        self.params_binder = None
 
     def clone(self, klass=None, memo=None, **kwargs):
         query = super(ExecutePreparedQuery, self).clone(klass=klass, memo=memo, **kwargs)
         query.prepare_params_values = self.prepare_params_values
+        query.prepare_params = self.prepare_params
+        query.params_binder = self.params_binder
         query._compiler = self._compiler
         return query
 
     def setup_metadata(self, using):
-        self.get_compiler(using).pre_sql_setup()
+        self.prepare_params_values = {}
+        self.prepare_params = []
+        compiler = self.get_compiler(using)
+        compiler.setup_execute_metadata()
+        self.params_binder = compiler.get_params_binder()
 
     def get_compiler(self, using=None, connection=None):
         if hasattr(self, '_compiler'):
@@ -104,9 +154,34 @@ class ExecutePreparedQuery(PrepareQuery):
         self._compiler = ExecutePreparedSQLCompiler(self, connection, using)
         return self._compiler
 
+    def bind(self, using, values=None, params=()):
+        '''
+        Returns copy of query with params of a single execute and own compiler for connection of the current thread.
+        Compiled statement and execute metadata are shared with copy, so execute doesn't change prepared query
+        and it can be executed from many threads at once.
+        '''
+        compiler = copy(self.get_compiler(using))
+        query = copy(self)
+        query._compiler = compiler
+        if values is None:
+            query.prepare_params_values = {}
+            query.prepare_params = params
+        else:
+            query.prepare_params_values = values
+            query.prepare_params = self.params_binder.bind(values)
+        compiler.query = query
+        compiler.connection = connections[using]
+        compiler.using = using
+        compiler.fetched_rows = None
+        compiler.execution_timer = None
+        return query
+
+    def clean_prepare_params_values(self, values):
+        return self.params_binder.clean(values)
+
     def set_prepare_params_values(self, values):
-        param_values = {}
-        for param in self.prepare_params_by_hash.values():
-            param_name = param.name
-            param_values[param_name] = param.normalize_value(values[param_name], values)
-        self.prepare_params_values = param_values
+        '''
+        Set cleaned values and positional params for the next execute
+        '''
+        self.prepare_params_values = values
+        self.prepare_params = self.params_binder.bind(values)
@@ -1,16 +1,36 @@
 from collections import Sequence
-from functools import wraps
+from copy import copy
+from functools import wraps, partial
+from itertools import islice, chain
+from time import perf_counter
 from django import get_version
-from django.db.models import QuerySet, BigIntegerField
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet, BigIntegerField, Count, Model, Prefetch, Q, DO_NOTHING
+from django.db.models.manager import BaseManager
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.base import ModelState
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.db.models.query import BaseIterable, ModelIterable, ValuesIterable, ValuesListIterable
+from django.db.models.sql.constants import MULTI
 from django.db import connections
 from django.db.models.lookups import IsNull, In
-from django.core.exceptions import ValidationError
-from .query import PrepareQuery, ExecutePreparedQuery
+from django.db.models.fields.related_lookups import MultiColSource
+from .operations import PreparedOperationsFactory
+from .query import PrepareQuery, PrepareUpdateQuery, PrepareDeleteQuery, ExecutePreparedQuery
 from .params import BindParam, BindArray
-from .utils import get_where_nodes
-from .exceptions import PreparedStatementException, QueryNotPrepared, IncorrectBindParameter, \
-    OperationOnPreparedStatement, NotSupportedLookup
+from .lookups import ArrayIn
+from .utils import get_where_nodes, get_query_tables, replace_where_params, replace_where_lookups
+from .exceptions import PreparedStatementException, QueryNotPrepared, OperationOnPreparedStatement, \
+    NotSupportedLookup
 from .statements_pool import statements_pool
+from .registry import prepared_statements_registry
+from .metrics import metrics_enabled, statement_metrics, ExecutionTimer
+from .result_cache import StatementResultCache, invalidate_written_tables
+
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:  # pragma: no cover
+    sync_to_async = None
 
 
 DJANGO_2 = get_version().startswith('2')
@@ -27,12 +47,124 @@ def check_is_prepared(msg):
     return _check_is_prepared
 
 
+def run_in_sync_thread(func, *args, **kwargs):
+    '''
+    Runs func in the thread of sync code, so it uses the same database connection and its prepared statements
+    '''
+    if sync_to_async is None:
+        raise ImproperlyConfigured('Async execute methods require asgiref package')
+    return sync_to_async(func, thread_sensitive=True)(*args, **kwargs)
+
+
+class PreparedModelIterable(BaseIterable):
+    '''
+    Same as ModelIterable, but uses converters and model init layout computed on prepare
+    '''
+    def __iter__(self):
+        queryset = self.queryset
+        db = queryset.db
+        compiler = queryset.query.get_compiler(using=db)
+        if compiler.model_layout is None or queryset._known_related_objects:
+            yield from ModelIterable(queryset, self.chunked_fetch, self.chunk_size)
+            return
+        results = compiler.execute_sql(chunked_fetch=self.chunked_fetch, chunk_size=self.chunk_size)
+        for row in compiler.results_iter(results):
+            yield compiler.create_instance(row)
+
+
+class LazyModelResults(Sequence):
+    '''
+    Sequence over fetched rows that converts row and creates model instance only when it's accessed
+    '''
+    def __init__(self, compiler, rows):
+        self.compiler = compiler
+        self.rows = rows
+        self._instances = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.rows)))]
+        if index < 0:
+            index += len(self.rows)
+        instance = self._instances.get(index)
+        if instance is None:
+            if not 0 <= index < len(self.rows):
+                raise IndexError('Result index out of range')
+            row = next(self.compiler.results_iter([[self.rows[index]]]))
+            instance = self._instances[index] = self.compiler.create_instance(row)
+        return instance
+
+    def __repr__(self):
+        return '<LazyModelResults: %d rows>' % len(self.rows)
+
+
+class PreparedPrefetch:
+    '''
+    Prepared query of prefetch_related lookup, it's filtered by related keys with key__in lookup of BindArray.
+    Array is bound as a single parameter when database supports it, otherwise keys are passed by buckets.
+    '''
+    BUCKET_SIZE = 100
+
+    def __init__(self, vendor, array_params):
+        self.vendor = vendor
+        self.array_params = array_params
+        self.key = None
+        self.array = None
+        self.queryset = None
+
+    def create_array(self, key):
+        self.key = key
+        if self.array_params:
+            self.array = BindArray('values', array=True)
+        else:
+            self.array = BindArray('values', self.BUCKET_SIZE, buckets=True)
+        return self.array
+
+    def execute(self, values, using):
+        '''
+        Returns related objects for keys or instances passed to key__in filter from database alias
+        '''
+        field = self.array.field_type
+        attname = field.target_field.attname if field.is_relation else field.attname
+        keys = [getattr(value, attname) if isinstance(value, Model) else value for value in values]
+        keys = list(dict.fromkeys(key for key in keys if key is not None))
+        if not keys:
+            return []
+        queryset = self.queryset.using(using)
+        if self.array.array:
+            return queryset.execute(values=keys)
+        results = []
+        for start in range(0, len(keys), self.array.size):
+            results.extend(queryset.execute(values=keys[start:start + self.array.size]))
+        return results
+
+
+class RowCountIterable(BaseIterable):
+    '''
+    Runs prepared update or delete and yields number of affected rows
+    '''
+    def __iter__(self):
+        queryset = self.queryset
+        rowcount = queryset.query.get_compiler(using=queryset.db).execute_rowcount_sql()
+        invalidate_written_tables(queryset._written_tables, queryset.db)
+        yield rowcount
+
+
 class PreparedQuerySet(QuerySet):
     def __init__(self, model=None, query=None, using=None, hints=None):
         super(PreparedQuerySet, self).__init__(model=model, query=query, using=using, hints=hints)
         if not query and not isinstance(self.query, ExecutePreparedQuery):
             self.query = PrepareQuery(self.model)
         self._prepare_query = None
+        self._bucketed_arrays = ()
+        self._bucket_queries = {}
+        self._eager = True
+        self._result_getter = None
+        self._statement_cache = None
+        self._written_tables = ()
         self.prepared = False
 
     def __repr__(self):
@@ -85,6 +217,12 @@ class PreparedQuerySet(QuerySet):
     def _clone(self, **kwargs):
         qs = super(PreparedQuerySet, self)._clone(**kwargs)
         qs._prepare_query = self._clone_query(PrepareQuery, self._prepare_query)
+        qs._bucketed_arrays = self._bucketed_arrays
+        qs._bucket_queries = self._bucket_queries
+        qs._eager = self._eager
+        qs._result_getter = self._result_getter
+        qs._statement_cache = self._statement_cache
+        qs._written_tables = self._written_tables
         return qs
 
     def _clone_query(self, klass, query=None):
@@ -94,90 +232,545 @@ class PreparedQuerySet(QuerySet):
         else:
             return query.clone(klass=klass)
 
-    def _execute_prepare(self):
+    def _execution_clone(self, query, using):
         '''
-        Checks that prepare executed for the current connection and execute it if not
+        Returns shallow copy of prepared queryset that runs query bound to params of a single execute on database
+        alias. Results are cached by copy, so prepared queryset is shared between threads without changes.
         '''
-        connection = connections[self.db]
-        name = self._prepare_query.prepare_statement_name
-        if not connection.connection or name not in statements_pool[connection.connection]:
-            self._prepare_query.get_prepare_compiler(self.db).execute_sql()
-            statements_pool[connection.connection].append(name)
+        # Regular clone copies query and pickling protocol of copy.copy fetches queryset
+        qs = self.__class__.__new__(self.__class__)
+        qs.__dict__.update(self.__dict__)
+        qs.query = query
+        qs._db = using
+        qs._result_cache = None
+        qs._prefetch_done = False
+        return qs
 
-    def _set_types_for_prepare_params(self):
+    def _execute_prepare(self, prepare_query=None, using=None):
         '''
-        Set field types for BindParams
+        Checks that prepare executed for the current connection of database alias and execute it if not
         '''
-        for filter_param, is_inner_query in get_where_nodes(self.query):
+        prepare_query = prepare_query or self._prepare_query
+        using = using or self.db
+        connection = connections[using]
+        connection.ensure_connection()
+        name = prepare_query.prepare_statement_name
+        if not statements_pool[connection].use(name):
+            started = perf_counter()
+            statement = prepare_query.get_prepare_compiler(using).execute_sql()
+            statements_pool.add(connection, name, statement)
+            if self._eager:
+                # Statement routed to another alias is prepared for its new connections too
+                prepared_statements_registry.register(using, prepare_query)
+            if metrics_enabled():
+                statement_metrics.record_prepare(name, perf_counter() - started)
+
+    def _get_where_bind_params(self, query):
+        '''
+        Returns (lookup, is_inner_query, expression) for all BindParams in query filters
+        '''
+        for filter_param, is_inner_query in get_where_nodes(query):
             expressions_list = filter_param.rhs
             if not isinstance(expressions_list, Sequence):
                 expressions_list = [expressions_list]
             for expression in expressions_list:
-                if not isinstance(expression, BindParam):
-                    continue
-                if type(filter_param) == IsNull:
-                    raise NotSupportedLookup(
-                        '%s lookup isn\'t supported in prepared statements' % filter_param.lookup_name)
-                if type(filter_param) == In and not isinstance(expression, BindArray):
-                    raise PreparedStatementException('Use BindArray instead of BindParam for in lookup.')
-                if is_inner_query:
-                    self.query.add_prepare_param(expression)
-                    prepare_param = expression
-                else:
-                    prepare_param = self.query.prepare_params_by_hash[expression.hash]
+                if isinstance(expression, BindParam):
+                    yield filter_param, is_inner_query, expression
+
+    @staticmethod
+    def _get_array_lookup(lookup):
+        '''
+        Returns ArrayIn lookup for in lookup with array BindArray, relation lookups are supported for single column
+        '''
+        if not isinstance(lookup, In) or not isinstance(lookup.rhs, BindArray) or not lookup.rhs.array:
+            return None
+        if isinstance(lookup.lhs, MultiColSource):
+            raise PreparedStatementException('Array parameters aren\'t supported for multi-column relations')
+        return ArrayIn(lookup.lhs, lookup.rhs)
+
+    def _set_types_for_prepare_params(self):
+        '''
+        Set field types for BindParams
+        '''
+        replace_where_lookups(self.query.where, self._get_array_lookup)
+        for filter_param, is_inner_query, expression in self._get_where_bind_params(self.query):
+            if type(filter_param) == IsNull:
+                raise NotSupportedLookup(
+                    '%s lookup isn\'t supported in prepared statements' % filter_param.lookup_name)
+            if isinstance(filter_param, In) and not isinstance(expression, BindArray):
+                raise PreparedStatementException('Use BindArray instead of BindParam for in lookup.')
+            if is_inner_query:
+                self.query.add_prepare_param(expression)
+                prepare_param = expression
+            else:
+                prepare_param = self.query.prepare_params_by_hash[expression.hash]
+            if not prepare_param.field_type:
+                prepare_param.field_type = filter_param.lhs.output_field
+        for field, model, value in getattr(self.query, 'values', ()):
+            if isinstance(value, BindParam):
+                prepare_param = self.query.prepare_params_by_hash[value.hash]
                 if not prepare_param.field_type:
-                    prepare_param.field_type = filter_param.lhs.output_field
+                    prepare_param.field_type = field
         for name, prepare_param in self.query.prepare_params_by_hash.items():
             if not prepare_param.field_type:
                 raise PreparedStatementException('Field type is required for %s' % name)
 
-    def prepare(self):
+    def prepare(self, eager=True, cache=None, ttl=None, plan_mode=None, warmup=None):
         '''
-        Compile prepare sql and mark qs as prepared
+        Compile prepare sql and mark qs as prepared.
+        Eager statements are prepared for every new connection right after it's created.
+        With cache fetched rows of execute are cached in Django cache with this alias or in process LRU for True.
+        plan_mode sets plan cache mode of database for executes of statement, warmup params are executed
+        right after prepare, so database can choose generic plan before the first execute.
         '''
+        if plan_mode is not None or warmup is not None:
+            self._check_plan_mode(plan_mode)
         self._set_types_for_prepare_params()
+        self.query.set_prepare_plan_mode(plan_mode)
         self._prepare_query = self.query
         self._prepare_query.get_prepare_compiler(self.db).prepare_sql()
         self.query = self._clone_query(klass=ExecutePreparedQuery, query=self._prepare_query)
         self.query.setup_metadata(self.db)
+        if self._iterable_class is ModelIterable:
+            self._iterable_class = PreparedModelIterable
+        if self._prefetch_related_lookups and self._iterable_class is PreparedModelIterable:
+            self._prefetch_related_lookups = self._prepare_prefetch_lookups(eager)
+        if cache:
+            self._statement_cache = StatementResultCache(cache, ttl, get_query_tables(self.query))
+        if eager:
+            prepared_statements_registry.register(self.db, self._prepare_query)
+        self._eager = eager
+        self._bucketed_arrays = tuple(sorted(
+            (prepare_param for prepare_param in self.query.prepare_params_by_hash.values()
+             if isinstance(prepare_param, BindArray) and prepare_param.buckets),
+            key=lambda prepare_param: prepare_param.name))
+        if self._bucketed_arrays:
+            sizes = tuple(array.size for array in self._bucketed_arrays)
+            self._bucket_queries = {sizes: (self._prepare_query, self.query)}
+        if warmup is not None:
+            values = self.query.clean_prepare_params_values(warmup)
+            prepare_query, query = self._get_queries(values)
+            prepare_query.set_prepare_warmup_params(query.params_binder.bind(values))
         self.prepared = True
         return self
 
+    def _check_plan_mode(self, plan_mode):
+        vendor = connections[self.db].vendor
+        plan_modes = PreparedOperationsFactory.create(vendor).PLAN_MODES
+        if not plan_modes:
+            raise PreparedStatementException('Plan mode isn\'t supported for %s' % vendor)
+        if plan_mode is not None and plan_mode not in plan_modes:
+            raise PreparedStatementException('Unknown plan mode \'%s\'' % plan_mode)
+
+    def _prepare_prefetch_lookups(self, eager):
+        '''
+        Replaces single level prefetch_related lookups with Prefetch objects that run prepared child statements,
+        other lookups are prefetched by regular queries
+        '''
+        lookups = []
+        for lookup in self._prefetch_related_lookups:
+            if isinstance(lookup, Prefetch):
+                through_attr, to_attr, prefetch_to = lookup.prefetch_through, lookup.to_attr, lookup.prefetch_to
+                can_prepare = lookup.queryset is None
+            else:
+                through_attr, to_attr, prefetch_to = lookup, None, lookup
+                can_prepare = True
+            # Prefetch with queryset can't follow lookup that already fetched the same relation
+            seen = any(prefetch_to == seen_to or seen_to.startswith(prefetch_to + LOOKUP_SEP)
+                       for seen_to in (getattr(seen, 'prefetch_to', seen) for seen in lookups))
+            if can_prepare and LOOKUP_SEP not in through_attr and not seen:
+                lookup = self._prepare_prefetch(lookup, through_attr, to_attr, eager)
+            lookups.append(lookup)
+        return tuple(lookups)
+
+    def _prepare_prefetch(self, lookup, through_attr, to_attr, eager):
+        '''
+        Prepares query that prefetcher of relation runs for instances and returns Prefetch with queryset that
+        executes it. Returns lookup as is if relation can't be prefetched with prepared statement.
+        '''
+        descriptor = getattr(self.model, through_attr, None)
+        # Prefetch queryset is built for placeholder instance, it's created without __init__ like unpickled model,
+        # so side effects and required arguments of __init__ don't matter
+        instance = self.model.__new__(self.model)
+        instance._state = ModelState()
+        for field in self.model._meta.concrete_fields:
+            setattr(instance, field.attname, None)
+        instance.pk = 0
+        instance._prefetched_objects_cache = {}
+        # Forward relations are prefetched by descriptor, reverse and many to many ones by related manager
+        if hasattr(descriptor, 'get_prefetch_queryset'):
+            prefetcher = descriptor
+        elif hasattr(descriptor, 'related_manager_cls'):
+            prefetcher = descriptor.related_manager_cls(instance)
+        else:
+            return lookup
+        # Prefetchers use default manager of related model and base manager for forward relations
+        if isinstance(prefetcher, BaseManager):
+            base = prefetcher.model._default_manager.get_queryset()
+        elif hasattr(prefetcher, 'get_queryset'):
+            base = prefetcher.get_queryset()
+        else:
+            return lookup
+        if not isinstance(base, PreparedQuerySet) or base.prepared:
+            return lookup
+        array_params = PreparedOperationsFactory.create(connections[self.db].vendor).has_array_params()
+        queryset = PrefetchQuerySet(model=base.model, query=self._clone_query(PrepareQuery, base.query),
+                                    using=self._db)
+        queryset._prefetch = prefetch = PreparedPrefetch(connections[self.db].vendor, array_params)
+        rel_qs = prefetcher.get_prefetch_queryset([instance], queryset._chain() if DJANGO_2 else queryset._clone())[0]
+        if rel_qs._prefetch is not prefetch or prefetch.key is None:
+            return lookup
+        prefetch.queryset = rel_qs.prepare(eager)
+        return Prefetch(through_attr, queryset=queryset, to_attr=to_attr)
+
+    def _prepare_bucket(self, sizes):
+        '''
+        Compiles statement with bucketed arrays of passed sizes
+        '''
+        prepare_query = self._clone_query(PrepareQuery, self._prepare_query)
+        prepare_query.set_prepare_statement_sql(None, ())
+        prepare_query.set_prepare_warmup_params(None)
+        # Arrays are shared with statements of other sizes and can be used by other threads,
+        # so bucket statement is compiled with resized copies of them
+        arrays = {}
+        for array, size in zip(self._bucketed_arrays, sizes):
+            arrays[array.hash] = copy(array)
+            arrays[array.hash].size = size
+        replace_where_params(prepare_query.where, arrays)
+        prepare_params = prepare_query.prepare_params_by_hash
+        prepare_query.prepare_params_by_hash = {param_hash: arrays.get(param_hash, prepare_param)
+                                                for param_hash, prepare_param in prepare_params.items()}
+        prepare_query.get_prepare_compiler(self.db).prepare_sql()
+        query = self._clone_query(klass=ExecutePreparedQuery, query=prepare_query)
+        query.setup_metadata(self.db)
+        if self._eager:
+            prepared_statements_registry.register(self.db, prepare_query)
+        return prepare_query, query
+
+    def _get_bucket_sizes(self, params):
+        return tuple(array.get_bucket_size(len(params[array.name])) for array in self._bucketed_arrays)
+
+    def _get_queries(self, params):
+        '''
+        Returns prepare and execute queries of statement for cleaned params, statements with bucketed arrays
+        are compiled for each used buckets sizes
+        '''
+        if not self._bucketed_arrays:
+            return self._prepare_query, self.query
+        sizes = self._get_bucket_sizes(params)
+        queries = self._bucket_queries.get(sizes)
+        if queries is None:
+            queries = self._bucket_queries[sizes] = self._prepare_bucket(sizes)
+        return queries
+
     def _check_execute_params(self, params):
         '''
-        Check names and types for execute parameters
+        Check names and types for execute parameters, returns cleaned parameters
         '''
         if not self.prepared:
             raise QueryNotPrepared('Query isn\'t prepared!')
-        if set(params.keys()) != self.query.prepare_params_names:
-            raise IncorrectBindParameter('Incorrect params')
-        # validate input parameters
-        for prepare_param in self.query.prepare_params_by_hash.values():
-            field = prepare_param.field_type
-            name = prepare_param.name
-            passed_param = params.get(name)
-            try:
-                passed_param = prepare_param.clean(passed_param)
-            except ValidationError as e:
-                raise e
-            except:
-                raise ValidationError('%s is incorrect type for %s parameter' % (passed_param, name))
-            field.run_validators(passed_param)
-            params[name] = passed_param
-        return params
+        return self.query.clean_prepare_params_values(params)
+
+    def _bind(self, params, timer=None, server_side=False):
+        '''
+        Checks execute parameters and prepares statement for the current connection of database alias
+        returned by router. Returns queryset that runs statement with these parameters.
+        '''
+        params = self._check_execute_params(params)
+        prepare_query, query = self._get_queries(params)
+        # Router can return different aliases, so alias is chosen once for execute
+        using = self.db
+        if timer is not None:
+            timer.lap('bind_time')
+        # Server side cursor of statement with cursor statement doesn't run EXECUTE, so it isn't prepared
+        if not (self._can_fetch_chunked(using, server_side) and
+                PreparedOperationsFactory.create(connections[using].vendor).has_cursor_statement()):
+            self._execute_prepare(prepare_query, using)
+        if timer is not None:
+            timer.lap('prepare_time')
+        qs = self._execution_clone(query.bind(using, params), using)
+        if timer is not None:
+            timer.lap('bind_time')
+        return qs
+
+    def _measure_iter(self, timer, get_iterator):
+        '''
+        Yields results of iterator and records execute metrics once it's exhausted or closed
+        '''
+        self.query.get_compiler(self.db).execution_timer = timer
+        rows = 0
+        try:
+            for row in get_iterator():
+                rows += 1
+                yield row
+        finally:
+            timer.finish(self.query.prepare_statement_name, rows)
+
+    def _execute_iterator(self, chunked_fetch, chunk_size, timer=None):
+        if DJANGO_2:
+            get_iterator = partial(self._iterable_class, self, chunked_fetch=chunked_fetch, chunk_size=chunk_size)
+        else:
+            get_iterator = partial(self._iterable_class, self, chunked_fetch=chunked_fetch)
+        if timer is None:
+            return get_iterator()
+        return self._measure_iter(timer, get_iterator)
 
-    def execute_iterator(self, **params):
+    @staticmethod
+    def _can_fetch_chunked(using, server_side):
+        return server_side and not connections[using].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS')
+
+    def execute_iterator(self, chunk_size=2000, server_side=False, **params):
         '''
         Runs execute command and prepare if needed. Returns iterator.
+        With server_side rows are fetched from database in chunks of chunk_size while iterating,
+        so memory usage doesn't depend on number of rows.
+        '''
+        timer = ExecutionTimer() if metrics_enabled() else None
+        qs = self._bind(params, timer, server_side)
+        return iter(qs._execute_iterator(self._can_fetch_chunked(qs.db, server_side), chunk_size, timer))
+
+    def _fetch_rows(self, params, timer=None):
+        '''
+        Returns bound query and fetched rows, statement is executed and prepared only if rows aren't cached
         '''
         params = self._check_execute_params(params)
-        self._execute_prepare()
-        self.query.set_prepare_params_values(params)
-        self._result_cache = None
-        return self._base_iter()
+        prepare_query, query = self._get_queries(params)
+        using = self.db
+        query = query.bind(using, params)
+        if timer is not None:
+            timer.lap('bind_time')
+        cache_entry = None
+        if self._statement_cache is not None:
+            rows, cache_entry = self._statement_cache.get(using, query.prepare_statement_name,
+                                                          query.prepare_params)
+            if rows is not None:
+                if timer is not None:
+                    timer.cache_hits += 1
+                return query, rows
+        self._execute_prepare(prepare_query, using)
+        if timer is not None:
+            timer.lap('prepare_time')
+        compiler = query.get_compiler(using)
+        compiler.execution_timer = timer
+        rows = list(chain.from_iterable(compiler.execute_sql(MULTI)))
+        if cache_entry is not None:
+            self._statement_cache.set(cache_entry, rows)
+        return query, rows
+
+    def _execute_cached(self, params, timer=None):
+        query, rows = self._fetch_rows(params, timer)
+        compiler = query.get_compiler()
+        compiler.set_fetched_rows(rows)
+        result = list(self._execution_clone(query, compiler.using)._base_iter())
+        if timer is not None:
+            timer.finish(query.prepare_statement_name, len(rows))
+        return result
+
+    def execute_lazy(self, **params):
+        '''
+        Returns sequence over fetched rows that creates model instances only when they are accessed.
+        Querysets that don't return model instances or use prefetch_related return list of results like execute.
+        '''
+        if (self._iterable_class is not PreparedModelIterable or
+                self.query.get_compiler(self.db).model_layout is None or
+                self._known_related_objects or self._prefetch_related_lookups):
+            return self.execute(**params)
+        timer = ExecutionTimer() if metrics_enabled() else None
+        query, rows = self._fetch_rows(params, timer)
+        if timer is not None:
+            # Instances are created on access, so only fetch of rows is measured
+            timer.finish(query.prepare_statement_name, len(rows))
+        return LazyModelResults(query.get_compiler(), rows)
+
+    def execute(self, **params):
+        timer = ExecutionTimer() if metrics_enabled() else None
+        if self._statement_cache is not None:
+            result = self._execute_cached(params, timer)
+            return self._result_getter(result) if self._result_getter else result
+        qs = self._bind(params, timer)
+        if timer is None:
+            result = list(qs._base_iter())
+        else:
+            result = list(qs._measure_iter(timer, qs._base_iter))
+        if self._result_getter:
+            return self._result_getter(result)
+        return result
 
-    def execute(self, **kwargs):
-        return list(self.execute_iterator(**kwargs))
+    def execute_many(self, params_list):
+        '''
+        Runs execute command for each parameters set in a single round trip when database supports it.
+        Returns list of results for each parameters set.
+        '''
+        if self._iterable_class is RowCountIterable:
+            return [self.execute(**params) for params in params_list]
+        params_list = [self._check_execute_params(params) for params in params_list]
+        if not self._bucketed_arrays:
+            return self._execute_many(params_list, self._prepare_query, self.query)
+        # Each bucket is a separate statement, so parameters sets are batched by bucket
+        buckets = {}
+        for index, params in enumerate(params_list):
+            buckets.setdefault(self._get_bucket_sizes(params), []).append(index)
+        results = [None] * len(params_list)
+        for indexes in buckets.values():
+            bucket_params_list = [params_list[index] for index in indexes]
+            prepare_query, query = self._get_queries(bucket_params_list[0])
+            for index, rows in zip(indexes, self._execute_many(bucket_params_list, prepare_query, query)):
+                results[index] = rows
+        return results
+
+    async def aexecute(self, **params):
+        return await run_in_sync_thread(self.execute, **params)
+
+    async def aexecute_iterator(self, chunk_size=2000, server_side=False, **params):
+        '''
+        Async version of execute_iterator, rows are fetched in the sync thread by chunks of chunk_size
+        '''
+        iterator = await run_in_sync_thread(self.execute_iterator, chunk_size, server_side, **params)
+        while True:
+            chunk = await run_in_sync_thread(lambda: list(islice(iterator, chunk_size)))
+            for item in chunk:
+                yield item
+            if len(chunk) < chunk_size:
+                return
+
+    async def aexecute_many(self, params_list):
+        return await run_in_sync_thread(self.execute_many, params_list)
+
+    def _execute_many(self, params_list, prepare_query, query):
+        timer = ExecutionTimer(len(params_list)) if metrics_enabled() else None
+        using = self.db
+        self._execute_prepare(prepare_query, using)
+        query = query.bind(using)
+        compiler = query.get_compiler(using)
+        if timer is not None:
+            timer.lap('prepare_time')
+            compiler.execution_timer = timer
+        fetched_results = compiler.execute_many_sql(params_list)
+        qs = self._execution_clone(query, using)
+        results = []
+        for rows in fetched_results:
+            compiler.set_fetched_rows(rows)
+            qs._result_cache = None
+            qs._prefetch_done = False
+            result = list(qs._base_iter())
+            results.append(self._result_getter(result) if self._result_getter else result)
+        if timer is not None:
+            timer.finish(query.prepare_statement_name, sum(len(rows) for rows in fetched_results))
+        return results
+
+    def explain_execute(self, analyze=False, **params):
+        '''
+        Returns plan that database uses for execute with params. With analyze statement is executed
+        and plan contains actual rows and timings.
+        '''
+        qs = self._bind(params)
+        return qs.query.get_compiler(qs.db).explain_sql(analyze)
+
+    def _check_aggregation(self, query):
+        has_limit = query.low_mark != 0 or query.high_mark is not None
+        if query.distinct or query.group_by is not None or has_limit or query.annotations or query.combinator:
+            raise PreparedStatementException('Aggregation can\'t be prepared for queries with distinct, limits, '
+                                             'grouping or annotations')
+
+    def _prepare_aggregate(self, aggregates, result_getter, eager=True):
+        qs = self._chain() if DJANGO_2 else self._clone()
+        query = qs.query
+        self._check_aggregation(query)
+        query.clear_select_clause()
+        query.clear_ordering(True)
+        for alias, aggregate_expr in aggregates.items():
+            query.add_annotation(aggregate_expr, alias, is_summary=True)
+            if not query.annotations[alias].contains_aggregate:
+                raise TypeError('%s is not an aggregate expression' % alias)
+        qs._fields = ()
+        qs._iterable_class = ValuesIterable
+        qs._result_getter = result_getter
+        return qs.prepare(eager)
+
+    @check_is_prepared('Prepare aggregate not allowed on prepared statement')
+    def prepare_aggregate(self, *args, eager=True, **kwargs):
+        '''
+        Prepares aggregation of queryset, execute returns dictionary with aggregates values
+        '''
+        for arg in args:
+            try:
+                kwargs[arg.default_alias] = arg
+            except (AttributeError, TypeError):
+                raise TypeError('Complex aggregates require an alias')
+        return self._prepare_aggregate(kwargs, lambda rows: rows[0], eager)
+
+    @check_is_prepared('Prepare count not allowed on prepared statement')
+    def prepare_count(self, *, eager=True):
+        '''
+        Prepares count of queryset rows, execute returns number
+        '''
+        return self._prepare_aggregate({'__count': Count('*')}, lambda rows: rows[0]['__count'], eager)
+
+    def _prepare_write(self, klass):
+        qs = self._chain() if DJANGO_2 else self._clone()
+        qs._for_write = True
+        qs.query = qs._clone_query(klass)
+        qs._iterable_class = RowCountIterable
+        qs._result_getter = lambda rows: rows[0]
+        qs._written_tables = tuple(get_query_tables(qs.query))
+        return qs
+
+    @check_is_prepared('Prepare update not allowed on prepared statement')
+    def prepare_update(self, *, eager=True, **kwargs):
+        '''
+        Prepares update of queryset rows, values can contain BindParams. Execute returns number of updated rows.
+        '''
+        if not self.query.can_filter():
+            raise PreparedStatementException('Cannot update a query once a slice has been taken.')
+        qs = self._prepare_write(PrepareUpdateQuery)
+        query = qs.query
+        query.add_update_values(kwargs)
+        query.get_initial_alias()
+        if query.related_updates or query.count_active_tables() > 1:
+            raise PreparedStatementException('Only updates of a single table can be prepared')
+        return qs.prepare(eager)
+
+    @check_is_prepared('Prepare delete not allowed on prepared statement')
+    def prepare_delete(self, *, eager=True, raw=False):
+        '''
+        Prepares delete of queryset rows with a single DELETE statement, so no signals are sent and cascades
+        are handled only by database. Models with reverse relations that aren't DO_NOTHING on delete are refused unless raw is set.
+        Execute returns number of deleted rows.
+        '''
+        if not self.query.can_filter():
+            raise PreparedStatementException('Cannot use limit/offset with delete.')
+        if not raw:
+            self._check_delete_relations()
+        qs = self._prepare_write(PrepareDeleteQuery)
+        query = qs.query
+        query.get_initial_alias()
+        if query.count_active_tables() > 1:
+            raise PreparedStatementException('Only deletes from a single table can be prepared')
+        return qs.prepare(eager)
+
+    def _check_delete_relations(self):
+        for related in get_candidate_relations_to_delete(self.model._meta):
+            if related.on_delete is not DO_NOTHING:
+                raise PreparedStatementException('Delete of %s can\'t be prepared, %s isn\'t DO_NOTHING on delete. '
+                                                 'Use raw=True to delete rows by database only'
+                                                 % (self.model._meta.label, related.field))
+
+    @check_is_prepared('Prepare exists not allowed on prepared statement')
+    def prepare_exists(self, *, eager=True):
+        '''
+        Prepares check that queryset contains any results, execute returns boolean
+        '''
+        qs = self._chain() if DJANGO_2 else self._clone()
+        query = qs.query
+        self._check_aggregation(query)
+        query.clear_select_clause()
+        query.clear_ordering(True)
+        query.add_extra({'a': 1}, None, None, None, None, None)
+        query.set_extra_mask(['a'])
+        query.set_limits(high=1)
+        qs._iterable_class = ValuesListIterable
+        qs._result_getter = bool
+        return qs.prepare(eager)
 
     @check_is_prepared('Iterator not allowed on prepared statement')
     def iterator(self, *args, **kwargs):
@@ -312,6 +905,72 @@ class PreparedQuerySet(QuerySet):
     def only(self, *fields):
         return super(PreparedQuerySet, self).only(*fields)  # pragma: no cover
 
-    @check_is_prepared('Using not allowed on prepare statement')
     def using(self, alias):
-        return super(PreparedQuerySet, self).using(alias)  # pragma: no cover
+        '''
+        Prepared queryset is executed on alias, database should have the same backend
+        '''
+        if not self.prepared:
+            return super(PreparedQuerySet, self).using(alias)
+        # Execute compiler is created on prepare, so it has connection statement was prepared for
+        prepared_vendor, vendor = self.query.get_compiler(alias).connection.vendor, connections[alias].vendor
+        if vendor != prepared_vendor:
+            raise PreparedStatementException('Statement prepared for %s can\'t be executed on %s' %
+                                             (prepared_vendor, vendor))
+        return self._execution_clone(self.query, alias)
+
+
+class PrefetchQuerySet(PreparedQuerySet):
+    '''
+    Queryset passed to prefetcher of prefetch_related lookup.
+    While prepare key__in filter added by prefetcher is replaced with BindArray and the query is prepared,
+    after that filter values are passed to prepared query when queryset is fetched.
+    Any other filter makes it a regular queryset.
+    '''
+    def __init__(self, model=None, query=None, using=None, hints=None):
+        super(PrefetchQuerySet, self).__init__(model=model, query=query, using=using, hints=hints)
+        self._prefetch = None
+        self._prefetch_values = None
+
+    def _clone(self, **kwargs):
+        qs = super(PrefetchQuerySet, self)._clone(**kwargs)
+        qs._prefetch = self._prefetch
+        qs._prefetch_values = self._prefetch_values
+        return qs
+
+    def _detach_prefetch(self):
+        '''
+        Returns regular queryset with filter values applied
+        '''
+        qs = self._chain() if DJANGO_2 else self._clone()
+        if self._prefetch_values is not None:
+            qs.query.add_q(Q(**{self._prefetch.key: self._prefetch_values}))
+        qs._prefetch = qs._prefetch_values = None
+        return qs
+
+    def _filter_or_exclude(self, negate, *args, **kwargs):
+        prefetch = self._prefetch
+        if prefetch is None or self.prepared:
+            return super(PrefetchQuerySet, self)._filter_or_exclude(negate, *args, **kwargs)
+        if not negate and not args and len(kwargs) == 1 and self._prefetch_values is None:
+            key, value = next(iter(kwargs.items()))
+            if prefetch.queryset is None and prefetch.key is None and key.endswith(LOOKUP_SEP + 'in'):
+                array = prefetch.create_array(key)
+                return super(PrefetchQuerySet, self)._filter_or_exclude(negate, **{key: array})
+            if prefetch.queryset is not None and key == prefetch.key:
+                qs = self._chain() if DJANGO_2 else self._clone()
+                qs._prefetch_values = value
+                return qs
+        return self._detach_prefetch()._filter_or_exclude(negate, *args, **kwargs)
+
+    def _fetch_all(self):
+        prefetch = self._prefetch
+        if self._result_cache is None and prefetch is not None and not self.prepared:
+            if prefetch.queryset is None:
+                # Prefetcher iterates queryset while its query is being prepared
+                self._result_cache = []
+            elif self._prefetch_values is not None:
+                if connections[self.db].vendor == prefetch.vendor:
+                    self._result_cache = prefetch.execute(self._prefetch_values, self.db)
+                else:
+                    self._result_cache = list(self._detach_prefetch())
+        super(PrefetchQuerySet, self)._fetch_all()
@@ -0,0 +1,63 @@
+from collections import defaultdict
+from weakref import WeakValueDictionary
+from django.db import DatabaseError
+from django.db.backends.signals import connection_created
+from .statements_pool import statements_pool, get_pool_size
+
+
+class PreparedStatementsRegistry(defaultdict):
+    '''
+    Stores prepare queries by database alias, so all of them can be prepared once connection is created
+    '''
+    def __init__(self):
+        super().__init__(WeakValueDictionary)
+
+    def register(self, using, query):
+        self[using][query.prepare_statement_name] = query
+
+    def prepare_connection(self, connection):
+        '''
+        Prepares all registered statements for connection in a single round trip
+        '''
+        queries = list(self[connection.alias].values())
+        pool_size = get_pool_size()
+        if pool_size is not None:
+            queries = queries[-pool_size:]
+        if not queries:
+            return
+        prepared_operations = None
+        compiled_statements = []
+        prepare_statements = []
+        warmups = []
+        for query in queries:
+            compiler = query.get_prepare_compiler(connection=connection)
+            if not compiler.prepared_operations.has_server_prepare():
+                compiled_statements.append((query.prepare_statement_name, compiler.execute_sql()))
+                continue
+            prepared_operations = compiler.prepared_operations
+            sql, params = compiler.prepare_sql()
+            prepare_statements.append((query.prepare_statement_name, compiler.get_statement(sql, params)))
+            warmup = compiler.get_warmup_sql()
+            if warmup is not None:
+                warmups.append(warmup)
+        statements_pool.add_many(connection, compiled_statements)
+        if not prepare_statements:
+            return
+        try:
+            with connection.cursor() as cursor:
+                # Statements are warmed up in the same round trip right after all of them are prepared
+                prepared_operations.prepare_many(cursor, [(statement.sql, statement.params)
+                                                          for _, statement in prepare_statements] + warmups)
+        except DatabaseError:
+            return  # Statements will be prepared on first execute
+        statements_pool.add_many(connection, prepare_statements)
+
+
+prepared_statements_registry = PreparedStatementsRegistry()
+
+
+def prepare_registered_statements(sender, connection, **kwargs):
+    prepared_statements_registry.prepare_connection(connection)
+
+
+connection_created.connect(prepare_registered_statements, dispatch_uid='prepare_registered_statements')
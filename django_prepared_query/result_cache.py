@@ -0,0 +1,162 @@
+from collections import OrderedDict, defaultdict
+from functools import partial
+from hashlib import md5
+from threading import Lock
+from time import monotonic
+from uuid import uuid4
+from django.apps import apps
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+
+KEY_PREFIX = 'prepared_query'
+
+
+class LocalResultCache(OrderedDict):
+    '''
+    Process wide LRU cache with the same interface as Django cache, used for prepare(cache=True).
+    It's shared by threads, so reordering and eviction are done under lock.
+    '''
+    def __init__(self, max_size=1024):
+        super().__init__()
+        self.max_size = max_size
+        self.lock = Lock()
+
+    def get_many(self, keys):
+        now = monotonic()
+        values = {}
+        with self.lock:
+            for key in keys:
+                item = super().get(key)
+                if item is None:
+                    continue
+                value, expires = item
+                if expires is not None and expires <= now:
+                    del self[key]
+                    continue
+                self.move_to_end(key)
+                values[key] = value
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        expires = monotonic() + timeout if timeout not in (None, DEFAULT_TIMEOUT) else None
+        with self.lock:
+            self[key] = value, expires
+            self.move_to_end(key)
+            while len(self) > self.max_size:
+                self.popitem(last=False)
+
+
+local_result_cache = LocalResultCache()
+
+# Caches used by statements for each table, so table version is changed in all of them
+_tables_caches = defaultdict(dict)
+# Models with connected invalidation receivers, they are connected only for tables of cached statements
+_connected_models = set()
+
+
+def _get_cache(cache):
+    if cache is True:
+        return local_result_cache
+    if isinstance(cache, str):
+        return caches[cache]
+    return cache
+
+
+def _get_version_key(table):
+    return '%s:version:%s' % (KEY_PREFIX, table)
+
+
+class StatementResultCache:
+    '''
+    Caches fetched rows of prepared statement by database, statement name and bound params.
+    Rows are stored with versions of tables used by statement, saving or deleting model changes version of its table,
+    so rows cached before it aren't used anymore.
+    '''
+    def __init__(self, cache, ttl, tables):
+        self.cache = cache
+        self.ttl = DEFAULT_TIMEOUT if ttl is None else ttl
+        self.tables = tuple(sorted(tables))
+        self.version_keys = [_get_version_key(table) for table in self.tables]
+        cache_id = cache if isinstance(cache, (str, bool)) else id(cache)
+        for table in self.tables:
+            _tables_caches[table][cache_id] = cache
+        connect_receivers(self.tables)
+
+    def get(self, using, name, params):
+        '''
+        Returns cached rows or None and entry that should be passed to set with fetched rows
+        '''
+        cache = _get_cache(self.cache)
+        key = '%s:%s:%s:%s' % (KEY_PREFIX, using, name, md5(repr(params).encode()).hexdigest())
+        values = cache.get_many([key] + self.version_keys)
+        versions = []
+        for version_key in self.version_keys:
+            version = values.get(version_key)
+            if version is None:
+                version = uuid4().hex
+                cache.set(version_key, version, None)
+            versions.append(version)
+        cached = values.get(key)
+        if cached is not None and cached[0] == versions:
+            return cached[1], None
+        return None, (key, versions)
+
+    def set(self, entry, rows):
+        key, versions = entry
+        _get_cache(self.cache).set(key, (versions, rows), self.ttl)
+
+
+def invalidate_tables(tables):
+    '''
+    Changes versions of tables in all caches used by statements
+    '''
+    for table in tables:
+        for cache in list(_tables_caches.get(table, {}).values()):
+            _get_cache(cache).set(_get_version_key(table), uuid4().hex, None)
+
+
+def invalidate_written_tables(tables, using=DEFAULT_DB_ALIAS):
+    '''
+    Invalidates rows cached for tables changed on database alias, used by signals and prepared writes
+    '''
+    if not any(table in _tables_caches for table in tables):
+        return
+    invalidate_tables(tables)
+    # Other connections can cache rows without changes until transaction is committed
+    if connections[using].in_atomic_block:
+        transaction.on_commit(partial(invalidate_tables, tables), using=using)
+
+
+def _get_model_tables(model):
+    opts = model._meta
+    return [opts.db_table] + [parent._meta.db_table for parent in opts.get_parent_list()]
+
+
+def invalidate_model(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    invalidate_written_tables(_get_model_tables(sender), using)
+
+
+def invalidate_m2m(sender, action, using=DEFAULT_DB_ALIAS, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_model(sender, using)
+
+
+def connect_receivers(tables):
+    '''
+    Connects invalidation receivers for models that write to tables, including proxy, child and m2m through models.
+    Models of other tables have no receivers, so their saves don't dispatch signals and deletes can be fast.
+    '''
+    tables = set(tables)
+    for model in apps.get_models(include_auto_created=True):
+        if model in _connected_models or tables.isdisjoint(_get_model_tables(model)):
+            continue
+        label = model._meta.label_lower
+        post_save.connect(invalidate_model, sender=model, dispatch_uid='prepared_query_invalidate_on_save_%s' % label)
+        post_delete.connect(invalidate_model, sender=model,
+                            dispatch_uid='prepared_query_invalidate_on_delete_%s' % label)
+        m2m_changed.connect(invalidate_m2m, sender=model,
+                            dispatch_uid='prepared_query_invalidate_on_m2m_changed_%s' % label)
+        _connected_models.add(model)
@@ -0,0 +1,35 @@
+from itertools import count
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def get_replicas():
+    '''
+    Returns database aliases of read replicas from PREPARED_STATEMENTS_REPLICAS setting
+    '''
+    return getattr(settings, 'PREPARED_STATEMENTS_REPLICAS', ())
+
+
+class ReplicasRouter:
+    '''
+    Routes reads to replicas in round-robin order, so executes of prepared statements are spread across them.
+    Related objects are read from replica of instance they're fetched for, writes use default database.
+    '''
+    def __init__(self):
+        self.counter = count()
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replicas:
+            return instance._state.db
+        return replicas[next(self.counter) % len(replicas)]
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = set(get_replicas())
+        databases.add(DEFAULT_DB_ALIAS)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,12 @@
+from django.dispatch import Signal
+
+
+# Sent with name and prepare_time arguments when statement is prepared for connection on execute
+statement_prepared = Signal()
+
+# Sent with name, calls, rows, bind_time, db_time, materialize_time and cache_hits arguments after execute
+statement_executed = Signal()
+
+# Sent with the same arguments as statement_executed when database time of call is above
+# PREPARED_STATEMENTS_SLOW_THRESHOLD setting
+slow_statement_executed = Signal()
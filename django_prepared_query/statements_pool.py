@@ -1,19 +1,142 @@
+from collections import OrderedDict, namedtuple
+from threading import Lock
 from weakref import WeakKeyDictionary
-from collections import defaultdict
+from django.conf import settings
 
 
-class StatementsPool(defaultdict):
-    pass
+DEFAULT_POOL_SIZE = 1000
+
+PreparedStatement = namedtuple('PreparedStatement', ['sql', 'params', 'deallocate_sql'])
+
+
+def get_pool_size():
+    '''
+    Returns max number of statements prepared for connection, None means unlimited pool
+    '''
+    pool_size = getattr(settings, 'PREPARED_STATEMENTS_POOL_SIZE', DEFAULT_POOL_SIZE)
+    return max(pool_size, 1) if pool_size is not None else None
+
+
+class ConnectionStatements(OrderedDict):
+    '''
+    LRU of statements prepared for connection of database alias with usage counters
+    '''
+    def __init__(self, raw_connection, alias):
+        super().__init__()
+        self.raw_connection_id = id(raw_connection)
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Plan cache mode was set in transaction that can be still running
+        self.plan_mode_set = False
+
+    def use(self, name):
+        '''
+        Marks statement as recently used, returns False if statement isn't prepared
+        '''
+        try:
+            self.move_to_end(name)
+        except KeyError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, name, statement, max_size):
+        '''
+        Adds statement and returns statements evicted to fit max_size
+        '''
+        self[name] = statement
+        self.move_to_end(name)
+        evicted = []
+        while max_size is not None and len(self) > max_size:
+            evicted.append(self.popitem(last=False)[1])
+        self.evictions += len(evicted)
+        return evicted
 
 
 class StatementsPool(WeakKeyDictionary):
-    def __getitem__(self, item):
+    '''
+    Stores prepared statements for each raw database connection, so statements are dropped on reconnect.
+    Raw connections that can't be weak referenced (sqlite3) are stored by connection wrapper.
+    '''
+    def __getitem__(self, connection):
+        raw_connection = connection.connection
         try:
-            return super().__getitem__(item)
+            return super().__getitem__(raw_connection)
         except KeyError:
-            if item:
-                self[item] = []
-            return super().__getitem__(item)
+            statements = self[raw_connection] = ConnectionStatements(raw_connection, connection.alias)
+            return statements
+        except TypeError:
+            statements = self.get(connection)
+            if statements is None or statements.raw_connection_id != id(raw_connection):
+                statements = self[connection] = ConnectionStatements(raw_connection, connection.alias)
+            return statements
+
+    def add(self, connection, name, statement):
+        '''
+        Adds statement prepared for connection and deallocates least recently used statements above pool size
+        '''
+        self.add_many(connection, [(name, statement)])
+
+    def add_many(self, connection, statements):
+        connection_statements = self[connection]
+        max_size = get_pool_size()
+        evicted = []
+        for name, statement in statements:
+            evicted.extend(connection_statements.add(name, statement, max_size))
+        deallocate_sql = ''.join(statement.deallocate_sql for statement in evicted if statement.deallocate_sql)
+        if deallocate_sql:
+            with connection.cursor() as cursor:
+                cursor.execute(deallocate_sql)
+
+    def get_stats(self, using=None):
+        '''
+        Returns hits, misses and evictions for all connections or connections of database alias
+        '''
+        stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'statements': 0}
+        for statements in list(self.values()):
+            if using is not None and statements.alias != using:
+                continue
+            stats['hits'] += statements.hits
+            stats['misses'] += statements.misses
+            stats['evictions'] += statements.evictions
+            stats['statements'] += len(statements)
+        return stats
 
 
 statements_pool = StatementsPool()
+
+
+class CompiledStatementsCache(OrderedDict):
+    '''
+    Process wide LRU cache of compiled prepare statements by query fingerprint.
+    It's shared by threads, so reordering and eviction are done under lock.
+    '''
+    def __init__(self, max_size=1024):
+        super().__init__()
+        self.max_size = max_size
+        self.lock = Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                self.move_to_end(key)
+            except KeyError:
+                return default
+            return self[key]
+
+    def set(self, key, value):
+        with self.lock:
+            self[key] = value
+            self.move_to_end(key)
+            while len(self) > self.max_size:
+                self.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+
+
+compiled_statements_cache = CompiledStatementsCache()
@@ -1,6 +1,27 @@
+from copy import copy
+from datetime import date, time, datetime, timedelta
+from decimal import Decimal
+from uuid import UUID
+from types import FunctionType, MethodType, BuiltinFunctionType
+from django.utils.functional import cached_property
+from django.db.models import Field
 from django.db.models.sql.where import WhereNode
 from django.db.models.sql.query import Query
 from django.db.models.fields.related_lookups import RelatedIn, RelatedLookupMixin
+from django.db.models.fields.reverse_related import ForeignObjectRel
+from .params import BindParam
+
+
+VALUE_TYPES = {type(None), bool, int, float, str, bytes, Decimal, date, time, datetime, timedelta, UUID}
+SEQUENCE_TYPES = {list, tuple}
+FUNCTION_TYPES = (FunctionType, MethodType, BuiltinFunctionType)
+SKIPPED_FINGERPRINT_ATTRIBUTES = {'_constructor_args', '_annotation_select_cache', '_extra_select_cache'}
+# Cached properties that can be set explicitly, e.g. output_field passed to expression
+EXPLICIT_CACHED_PROPERTIES = {'output_field'}
+
+
+class NotFingerprintable(Exception):
+    pass
 
 
 def _traverse(node):
@@ -20,3 +41,126 @@ def _traverse(node):
 
 def get_where_nodes(query):
     return _traverse(query.where)
+
+
+def replace_where_lookups(node, replace):
+    '''
+    Replaces lookups of where node and its subqueries with lookups returned by replace, None keeps lookup.
+    Lookups are shared by clones of query, so they are swapped in copies instead of being changed.
+    '''
+    for index, child in enumerate(node.children):
+        if isinstance(child, WhereNode):
+            replace_where_lookups(child, replace)
+            continue
+        rhs = getattr(child, 'rhs', None)
+        if isinstance(rhs, Query):
+            rhs = rhs.clone()
+            replace_where_lookups(rhs.where, replace)
+            lookup = copy(child)
+            lookup.rhs = rhs
+        else:
+            lookup = replace(child)
+            if lookup is None:
+                continue
+        node.children[index] = lookup
+
+
+def replace_where_params(node, replacements):
+    '''
+    Replaces BindParams in filters of where node and its subqueries with replacements by hash
+    '''
+    def replace(child):
+        rhs = getattr(child, 'rhs', None)
+        if isinstance(rhs, BindParam):
+            if rhs.hash not in replacements:
+                return None
+            rhs = replacements[rhs.hash]
+        elif isinstance(rhs, (list, tuple)) and any(isinstance(expression, BindParam) and
+                                                    expression.hash in replacements for expression in rhs):
+            rhs = type(rhs)(replacements.get(getattr(expression, 'hash', None), expression) for expression in rhs)
+        else:
+            return None
+        lookup = copy(child)
+        lookup.rhs = rhs
+        return lookup
+
+    replace_where_lookups(node, replace)
+
+
+def _get_inner_queries(expression):
+    if isinstance(expression, Query):
+        yield expression
+        return
+    if isinstance(expression, WhereNode):
+        children = expression.children
+    else:
+        children = expression.get_source_expressions() if hasattr(expression, 'get_source_expressions') else ()
+        for attr in ('query', 'queryset'):  # Subquery and Exists expressions
+            inner_query = getattr(expression, attr, None)
+            inner_query = getattr(inner_query, 'query', inner_query)
+            if isinstance(inner_query, Query):
+                yield inner_query
+    for child in children:
+        yield from _get_inner_queries(child)
+
+
+def get_query_tables(query):
+    '''
+    Returns names of tables used by query and its subqueries
+    '''
+    tables = {query.get_meta().db_table}
+    tables.update(join.table_name for join in query.alias_map.values())
+    for expression in [query.where] + list(query.annotations.values()):
+        for inner_query in _get_inner_queries(expression):
+            tables.update(get_query_tables(inner_query))
+    return tables
+
+
+def _is_skipped_attribute(value_type, key):
+    # Cached properties are filled on compile, e.g. for shared Col objects of fields. Resolved output_field
+    # is derived from source expressions, so it's kept too and doesn't make fingerprints of different queries equal
+    return (key in SKIPPED_FINGERPRINT_ATTRIBUTES or key.startswith('prepare_') or
+            key not in EXPLICIT_CACHED_PROPERTIES and isinstance(getattr(value_type, key, None), cached_property))
+
+
+def _fingerprint(value, path):
+    value_type = value.__class__
+    if value_type in VALUE_TYPES:
+        return value_type, value
+    if value_type in SEQUENCE_TYPES:
+        return tuple([_fingerprint(item, path) for item in value])
+    if isinstance(value, dict):
+        return tuple([(key, _fingerprint(item, path)) for key, item in value.items()])
+    if isinstance(value, type):
+        return value
+    if isinstance(value, (set, frozenset)):
+        return frozenset([_fingerprint(item, path) for item in value])
+    if isinstance(value, BindParam):
+        return value_type, value.name, value.size, getattr(value, 'array', False), _fingerprint(value.field_type, path)
+    if isinstance(value, Field):
+        if hasattr(value, 'model'):
+            return value.model, value.name
+        field_path, args, kwargs = value.deconstruct()[1:]
+        return field_path, _fingerprint(args, path), _fingerprint(kwargs, path)
+    if isinstance(value, ForeignObjectRel):
+        return value_type, _fingerprint(value.field, path)
+    if isinstance(value, FUNCTION_TYPES):
+        return value.__qualname__
+    if not hasattr(value, '__dict__') or id(value) in path:
+        raise NotFingerprintable
+    path.add(id(value))
+    fingerprint = value_type, tuple([(key, _fingerprint(item, path)) for key, item in value.__dict__.items()
+                                     if not _is_skipped_attribute(value_type, key)])
+    path.discard(id(value))
+    return fingerprint
+
+
+def get_query_fingerprint(query):
+    '''
+    Returns hashable structure of query that is equal for queries with the same sql,
+    BindParams are compared by name and type. Returns None if query contains unknown objects.
+    '''
+    try:
+        return _fingerprint(query, set())
+    except NotFingerprintable:
+        return None
@@ -13,6 +13,9 @@ setup(
     version=__version__,
     packages=['django_prepared_query'],
     include_package_data=True,
+    extras_require={
+        'async': ['asgiref'],
+    },
     url='https://github.com/DimaKudosh/django-prepared-query',
     license='MIT',
     author='Dima Kudosh',
@@ -13,7 +13,7 @@ TESTS_DIR = join(SOURCE_DIR, 'tests')
 sys.path.append(SOURCE_DIR)
 sys.path.append(TESTS_DIR)
 
-AVAILABLE_DATABASES = ['postgresql', 'mysql']
+AVAILABLE_DATABASES = ['postgresql', 'mysql', 'sqlite']
 CURRENT_DB = AVAILABLE_DATABASES[0]
 
 DATABASES = {
@@ -24,9 +24,16 @@ DATABASES = {
     'mysql': {
         'ENGINE': 'django.db.backends.mysql',
         'NAME': 'prepared_statements_test',
-    }
+    },
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'prepared_statements_test',
+    },
 }
+for db in list(DATABASES):
+    DATABASES['%s_replica' % db] = dict(DATABASES[db], TEST={'MIRROR': db})
 DATABASES['default'] = DATABASES[CURRENT_DB]
+DATABASES['replica'] = DATABASES['%s_replica' % CURRENT_DB]
 
 
 parser = argparse.ArgumentParser()
@@ -37,6 +44,7 @@ args = parser.parse_args()
 def run_tests(db):
     print('Run tests for %s' % db)
     connections['default'] = connections[db]
+    connections['replica'] = connections['%s_replica' % db]
     return test_runner.run_tests(['tests'])
 
 
@@ -45,7 +53,7 @@ django.setup()
 test_runner = DiscoverRunner(top_level=TESTS_DIR, interactive=False, keepdb=True)
 failures = 0
 if args.db:
-    if args.db in AVAILABLE_DATABASES:
+    if args.db in DATABASES:
         failures = run_tests(args.db)
     else:
         print('Incorrect database name')
@@ -31,6 +31,19 @@ class Book(models.Model):
     pubdate = models.DateField()
 
 
+class RequiredArgsBook(Book):
+    '''
+    Book that can't be created without field values
+    '''
+    class Meta:
+        proxy = True
+
+    def __init__(self, *args, **kwargs):
+        if not args and not kwargs:
+            raise TypeError('Book requires field values')
+        super().__init__(*args, **kwargs)
+
+
 class BigAutoModel(models.Model):
     objects = PreparedManager()
     id = models.BigAutoField(primary_key=True)
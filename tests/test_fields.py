@@ -1,10 +1,19 @@
 from datetime import datetime, date, time, timedelta
 from decimal import Decimal
 from uuid import UUID
+from unittest import skipIf
 from django.test import TestCase
+from django.db import connection
 from django.core.exceptions import ValidationError
 from test_app.models import AllFieldsModel, BigAutoModel
 from django_prepared_query import BindParam, NotSupportedLookup
+from django_prepared_query.operations import PreparedOperationsFactory
+
+
+client_adapted = skipIf(PreparedOperationsFactory.create(connection.vendor).has_server_prepare(),
+                        'Values are adapted by the database for server side prepared statements')
+server_adapted = skipIf(not PreparedOperationsFactory.create(connection.vendor).has_server_prepare(),
+                        'Values are adapted by Django for statements compiled on the client')
 
 
 class FieldsTestCase(TestCase):
@@ -30,8 +39,18 @@ class FieldsTestCase(TestCase):
         '''
         qs = AllFieldsModel.objects.filter(binary=BindParam('binary')).prepare()
         qs.execute(binary=b'123')
+
+    @server_adapted
+    def test_binary_text(self):
+        qs = AllFieldsModel.objects.filter(binary=BindParam('binary')).prepare()
         qs.execute(binary='123')
 
+    @client_adapted
+    def test_binary_text_adapt(self):
+        qs = AllFieldsModel.objects.filter(binary=BindParam('binary')).prepare()
+        with self.assertRaises(ValidationError):
+            qs.execute(binary='123')
+
     def test_boolean(self):
         qs = AllFieldsModel.objects.filter(boolean=BindParam('boolean')).prepare()
         qs.execute(boolean=True)
@@ -79,8 +98,18 @@ class FieldsTestCase(TestCase):
         td = timedelta(minutes=1)
         qs = AllFieldsModel.objects.filter(duration=BindParam('duration')).prepare()
         qs.execute(duration=td)
+
+    @server_adapted
+    def test_duration_text(self):
+        qs = AllFieldsModel.objects.filter(duration=BindParam('duration')).prepare()
         qs.execute(duration='1 minute')
 
+    @client_adapted
+    def test_duration_text_adapt(self):
+        qs = AllFieldsModel.objects.filter(duration=BindParam('duration')).prepare()
+        with self.assertRaises(ValidationError):
+            qs.execute(duration='1 minute')
+
     def test_email(self):
         qs = AllFieldsModel.objects.filter(email=BindParam('email')).prepare()
         qs.execute(email='some@mail.com')
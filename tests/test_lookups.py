@@ -1,6 +1,8 @@
 from datetime import datetime, date, time
 from django.test import TestCase
+from django.db import connection
 from django.core.exceptions import ValidationError
+from django.db.models.fields.related_lookups import RelatedIn
 from test_app.models import Author
 from django_prepared_query import BindParam, BindArray, NotSupportedLookup, PreparedStatementException
 
@@ -177,6 +179,48 @@ class PreparedStatementsTestCase(TestCase):
             ids.append(5)
             qs.execute(ids=ids)
 
+    def test_in_lookup_buckets(self):
+        ids = [1, 2, 3]
+        array = BindArray('ids', 10, buckets=True)
+        self.assertListEqual([array.get_bucket_size(i) for i in (0, 1, 2, 3, 5, 9, 10)], [1, 1, 2, 4, 8, 10, 10])
+        qs = Author.objects.filter(id__in=array).prepare()
+        self.assertEqual(qs.execute(ids=ids), list(Author.objects.filter(id__in=ids)))
+        self.assertEqual(qs._bucket_queries[(4,)][1].prepare_params_sizes[array.hash], 4)
+        self.assertEqual(qs.query.prepare_params_sizes[array.hash], 10)  # Execute doesn't change prepared queryset
+        self.assertEqual(qs.execute(ids=ids[:1]), list(Author.objects.filter(id__in=ids[:1])))
+        self.assertEqual(qs.execute(ids=ids[:2]), list(Author.objects.filter(id__in=ids[:2])))
+        self.assertEqual(qs.execute_many([{'ids': ids}, {'ids': ids[:1]}]),
+                         [list(Author.objects.filter(id__in=ids)), list(Author.objects.filter(id__in=ids[:1]))])
+        self.assertEqual(len(qs._bucket_queries), 4)  # max size and 3 buckets
+        with self.assertRaises(ValidationError):
+            qs.execute(ids=list(range(11)))
+
+    def test_in_lookup_array(self):
+        ids = [1, 2, 3]
+        if connection.vendor != 'postgresql':
+            with self.assertRaises(PreparedStatementException):
+                Author.objects.filter(id__in=BindArray('ids', array=True)).prepare()
+            return
+        qs = Author.objects.filter(id__in=BindArray('ids', array=True)).prepare()
+        self.assertIn('= ANY($1::integer[])', qs.query.prepare_statement_sql)
+        self.assertEqual(qs.execute(ids=[]), [])
+        self.assertEqual(qs.execute(ids=ids), list(Author.objects.filter(id__in=ids)))
+        self.assertEqual(qs.execute(ids=list(range(2000))), list(Author.objects.all()))
+        with self.assertRaises(PreparedStatementException):
+            BindArray('ids')
+
+    def test_in_lookup_array_relation(self):
+        base_qs = Author.objects.filter(books__in=BindArray('ids', array=True))
+        if connection.vendor != 'postgresql':
+            with self.assertRaises(PreparedStatementException):
+                base_qs.all().prepare()
+            return
+        qs = base_qs.all().prepare()
+        self.assertIn('= ANY($1::integer[])', qs.query.prepare_statement_sql)
+        self.assertEqual(qs.execute(ids=[1, 2]), list(Author.objects.filter(books__in=[1, 2])))
+        # Lookup is shared by clones of query, so it's replaced only in prepared query
+        self.assertIs(type(base_qs.query.where.children[0]), RelatedIn)
+
     def test_isnull_lookup(self):
         with self.assertRaises(NotSupportedLookup):
             Author.objects.filter(id__isnull=BindParam('null')).prepare()
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from django.test import TransactionTestCase, override_settings
+from django.db import connections
+from test_app.models import Author
+from django_prepared_query import BindParam
+from django_prepared_query.metrics import statement_metrics, MetricsRegistry
+from django_prepared_query.signals import statement_prepared, statement_executed, slow_statement_executed
+
+
+class MetricsTestCase(TransactionTestCase):
+    def setUp(self):
+        Author.objects.create(name='Bob Dylan', age=50, gender='m')
+        Author.objects.create(name='Kazuo Ishiguro', age=50, gender='m')
+        statement_metrics.reset()
+        connections.close_all()
+
+    def test_metrics_disabled(self):
+        prepared_qs = Author.objects.filter(age=BindParam('age')).prepare(eager=False)
+        prepared_qs.execute(age=50)
+        self.assertDictEqual(statement_metrics.snapshot(), {})
+
+    @override_settings(PREPARED_STATEMENTS_METRICS=True)
+    def test_execute_metrics(self):
+        prepared_qs = Author.objects.filter(age=BindParam('age')).order_by('name').prepare(eager=False)
+        name = prepared_qs.query.prepare_statement_name
+        prepared_qs.execute(age=50)
+        prepared_qs.execute(age=10)
+        list(prepared_qs.execute_iterator(age=50))
+        prepared_qs.execute_many([{'age': 50}, {'age': 50}])
+        metrics = statement_metrics.snapshot()[name]
+        self.assertEqual(metrics['calls'], 5)
+        self.assertEqual(metrics['prepares'], 1)
+        self.assertEqual(metrics['rows'], 8)
+        for timing in ('prepare_time', 'bind_time', 'db_time', 'materialize_time'):
+            self.assertGreater(metrics[timing], 0)
+        statement_metrics.reset()
+        self.assertDictEqual(statement_metrics.snapshot(), {})
+
+    @override_settings(PREPARED_STATEMENTS_METRICS=True)
+    def test_cached_and_lazy_execute_metrics(self):
+        prepared_qs = Author.objects.filter(age=BindParam('age')).order_by('-name').prepare(eager=False, cache=True)
+        name = prepared_qs.query.prepare_statement_name
+        prepared_qs.execute(age=50)
+        prepared_qs.execute(age=50)
+        prepared_qs.execute_lazy(age=50)
+        metrics = statement_metrics.snapshot()[name]
+        self.assertEqual(metrics['calls'], 3)
+        self.assertEqual(metrics['cache_hits'], 2)
+        self.assertEqual(metrics['prepares'], 1)
+        self.assertEqual(metrics['rows'], 6)
+        self.assertGreater(metrics['db_time'], 0)
+
+    @override_settings(PREPARED_STATEMENTS_METRICS=True, PREPARED_STATEMENTS_SLOW_THRESHOLD=0)
+    def test_metrics_signals(self):
+        received = []
+
+        def receiver(signal, name, **kwargs):
+            received.append((signal, name))
+
+        prepared_qs = Author.objects.filter(age=BindParam('age')).order_by('age').prepare(eager=False)
+        name = prepared_qs.query.prepare_statement_name
+        for signal in (statement_prepared, statement_executed, slow_statement_executed):
+            signal.connect(receiver)
+            self.addCleanup(signal.disconnect, receiver)
+        prepared_qs.execute(age=50)
+        self.assertListEqual(received, [(statement_prepared, name), (statement_executed, name),
+                                        (slow_statement_executed, name)])
+        self.assertEqual(statement_metrics.snapshot()[name]['slow_calls'], 1)
+
+    def test_metrics_threads(self):
+        class SlowMetricsRegistry(MetricsRegistry):
+            # Switching threads after lookup makes concurrent creation of the same metrics likely
+            def get(self, name, default=None):
+                metrics = super().get(name, default)
+                sleep(0.001)
+                return metrics
+
+        registry = SlowMetricsRegistry()
+
+        def record(thread):
+            for i in range(20):
+                registry.record_execute('statement_%d' % (i % 4), 1, 2, 0.0, 0.0, 0.0)
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(record, range(8)))
+        snapshot = registry.snapshot()
+        self.assertEqual(sum(metrics['calls'] for metrics in snapshot.values()), 160)
+        self.assertEqual(sum(metrics['rows'] for metrics in snapshot.values()), 320)
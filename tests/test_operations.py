@@ -0,0 +1,24 @@
+from django.test import SimpleTestCase
+from django_prepared_query.operations import SqLitePreparedOperations
+
+
+class SqLitePreparedOperationsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.operations = SqLitePreparedOperations()
+
+    def test_compile_statement(self):
+        sql = 'SELECT * FROM book WHERE name = %s AND pages > ?1 AND rating IN (?2, ?3) LIMIT ?4'
+        compiled_sql, layout = self.operations.compile_statement(sql, ['name'])
+        self.assertEqual(compiled_sql, 'SELECT * FROM book WHERE name = %s AND pages > %s AND rating IN (%s, %s) '
+                                       'LIMIT %s')
+        self.assertEqual(layout, ((False, 'name'), (True, 0), (True, 1), (True, 2), (True, 3)))
+
+    def test_compile_statement_with_escaped_percent(self):
+        sql = 'SELECT * FROM book WHERE name LIKE \'%%s\' AND pages > ?1'
+        compiled_sql, layout = self.operations.compile_statement(sql, [])
+        self.assertEqual(compiled_sql, 'SELECT * FROM book WHERE name LIKE \'%%s\' AND pages > %s')
+        self.assertEqual(layout, ((True, 0),))
+
+    def test_bind_params(self):
+        layout = ((True, 1), (False, 'fixed'), (True, 0))
+        self.assertEqual(self.operations.bind_params(layout, [1, 2]), [2, 'fixed', 1])
@@ -1,8 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from time import sleep
+from unittest import skipIf
+from unittest.mock import patch
 from django.test import TestCase
-from django.db.models import Case, When, CharField, BooleanField, Value, IntegerField, Count
-from test_app.models import Author, Publisher, Book
-from django_prepared_query import BindParam, QueryNotPrepared, IncorrectBindParameter, PreparedStatementException
+from django.db import connection, transaction, DatabaseError
+from django.db.models import Prefetch, Case, When, CharField, BooleanField, Value, IntegerField, Count, F, Max, Avg, \
+    FloatField, DecimalField, ExpressionWrapper
+from django.db.models.functions import Cast
+from test_app.models import Author, Publisher, Book, RequiredArgsBook, AllFieldsModel
+from django_prepared_query.compiler import PrepareSQLCompiler, ExecutePreparedSQLCompiler
+from django_prepared_query.operations import PreparedOperationsFactory
+from django_prepared_query.queryset import sync_to_async
+from django_prepared_query.statements_pool import statements_pool
+from django_prepared_query.utils import get_query_fingerprint
+from django_prepared_query import BindParam, BindArray, QueryNotPrepared, IncorrectBindParameter, \
+    PreparedStatementException, OperationOnPreparedStatement
+
+
+# Number of PREPARE queries per statement, SQLite statements are prepared by the driver
+PREPARE_QUERIES = int(PreparedOperationsFactory.create(connection.vendor).has_server_prepare())
 
 
 class PreparedStatementsTestCase(TestCase):
@@ -37,6 +54,10 @@ class PreparedStatementsTestCase(TestCase):
         with self.assertRaises(IncorrectBindParameter):
             prepared_qs.execute(name='Bob Dylan', another_param=1)
 
+    def test_reserved_param_name(self):
+        with self.assertRaises(IncorrectBindParameter):
+            Author.objects.filter(age=BindParam('chunk_size'))
+
     def test_execute_param_without_type(self):
         qs = Author.objects.annotate(
             is_specified_gender=Case(
@@ -82,22 +103,54 @@ class PreparedStatementsTestCase(TestCase):
 
     def test_select_related(self):
         prepared_qs = Book.objects.select_related('publisher').prepare()
-        with self.assertNumQueries(2):  # Prepare and execute
+        with self.assertNumQueries(1 + PREPARE_QUERIES):  # Prepare and execute
             book = prepared_qs.execute()[0]
             publisher = book.publisher
 
     def test_prefetch_related(self):
         author_names = ['Svetlana Alexievich', 'Kazuo Ishiguro']
         prepared_qs = Author.objects.filter(name__in=author_names).prefetch_related('books').prepare()
-        with self.assertNumQueries(3):  # Prepare, execute and prefetch query
+        with self.assertNumQueries(2 + 2 * PREPARE_QUERIES):  # Prepare and execute of query and prefetch query
             authors = prepared_qs.execute()
             list(authors[0].books.all())
             list(authors[1].books.all())
+        with self.assertNumQueries(2):  # Execute of query and prefetch query
+            authors = prepared_qs.execute()
+            books = [list(author.books.all()) for author in authors]
+        self.assertListEqual(books, [list(author.books.all())
+                                     for author in Author.objects.filter(name__in=author_names)])
+
+    def test_prefetch_related_without_model_init(self):
+        prepared_qs = RequiredArgsBook.objects.prefetch_related('authors', 'publisher').prepare()
+        self.assertIsInstance(prepared_qs._prefetch_related_lookups[0], Prefetch)
+        prepared_qs.execute()
+        with self.assertNumQueries(3):  # Query, authors prefetch query, regular query of publisher
+            book = prepared_qs.execute()[0]
+            self.assertEqual(book.publisher.name, 'Test Publisher')
+            self.assertListEqual([author.name for author in book.authors.all()], ['Svetlana Alexievich'])
+
+    def test_prepared_prefetch_related(self):
+        book_name = 'The Unwomanly Face of War'
+        prepared_qs = Book.objects.filter(name=BindParam('name')).prefetch_related(
+            'authors', 'publisher', 'publisher__book_set').prepare()
+        prepared_qs.execute(name=book_name)
+        with self.assertNumQueries(4):  # Query, authors and publisher prefetch queries, regular query of books
+            book = prepared_qs.execute(name=book_name)[0]
+        with self.assertNumQueries(0):
+            self.assertListEqual([author.name for author in book.authors.all()], ['Svetlana Alexievich'])
+            self.assertEqual(book.publisher.name, 'Test Publisher')
+            self.assertListEqual(list(book.publisher.book_set.all()), [book])
+        self.assertListEqual(prepared_qs.execute(name='Unknown'), [])
+        prepared_qs = Publisher.objects.prefetch_related(Prefetch('book_set', to_attr='books')).prepare()
+        prepared_qs.execute()
+        with self.assertNumQueries(2):
+            publisher = prepared_qs.execute()[0]
+            self.assertListEqual([book.name for book in publisher.books], [book_name])
 
     def test_only(self):
         author_name = 'Svetlana Alexievich'
         prepared_qs = Author.objects.filter(name=author_name).only('id').prepare()
-        with self.assertNumQueries(2):  # Prepare, execute
+        with self.assertNumQueries(1 + PREPARE_QUERIES):  # Prepare, execute
             author = prepared_qs.execute()[0]
         with self.assertNumQueries(1):
             author_id = author.id
@@ -106,14 +159,14 @@ class PreparedStatementsTestCase(TestCase):
     def test_defer(self):
         author_name = 'Svetlana Alexievich'
         prepared_qs = Author.objects.filter(name=author_name).defer('name').prepare()
-        with self.assertNumQueries(2):  # Prepare, execute
+        with self.assertNumQueries(1 + PREPARE_QUERIES):  # Prepare, execute
             author = prepared_qs.execute()[0]
         with self.assertNumQueries(1):
             author_id = author.id
             author_name = author.name  # Deferred field must generate query
 
     def test_same_prepare(self):
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(1 + PREPARE_QUERIES):
             Author.objects.all().prepare().execute()
         with self.assertNumQueries(1):
             Author.objects.all().prepare().execute()
@@ -146,6 +199,228 @@ class PreparedStatementsTestCase(TestCase):
         with self.assertRaises(StopIteration):
             next(authors_iterator)
 
+    def test_execute_iterator_server_side(self):
+        prepared_qs = Author.objects.filter(age=BindParam('age')).order_by('pk').prepare()
+        expected_result = list(Author.objects.filter(age=50).order_by('pk'))
+        with patch.object(ExecutePreparedSQLCompiler, 'execute_chunked_sql', autospec=True,
+                          side_effect=ExecutePreparedSQLCompiler.execute_chunked_sql) as execute_chunked_sql:
+            self.assertListEqual(list(prepared_qs.execute_iterator(chunk_size=1, server_side=True, age=50)),
+                                 expected_result)
+            self.assertEqual(execute_chunked_sql.call_count, 1)
+            self.assertListEqual(list(prepared_qs.execute_iterator(age=50)), expected_result)
+            self.assertEqual(execute_chunked_sql.call_count, 1)
+        if connection.vendor == 'postgresql':
+            # Cursor runs statement sql compiled on prepare, so EXECUTE statement isn't prepared
+            prepared_qs = Author.objects.filter(age__gte=BindParam('age')).order_by('pk').prepare(eager=False)
+            self.assertListEqual(list(prepared_qs.execute_iterator(server_side=True, age=50)), expected_result)
+            self.assertNotIn(prepared_qs.query.prepare_statement_name, statements_pool[connection])
+        ids = [author.pk for author in expected_result[:3]]
+        prepared_qs = Author.objects.filter(pk__in=BindArray('ids', 8, buckets=True)).order_by('pk') \
+            .values_list('name', flat=True).prepare()
+        authors_iterator = prepared_qs.execute_iterator(chunk_size=2, server_side=True, ids=ids)
+        self.assertListEqual(prepared_qs.execute(ids=ids[:1]), [expected_result[0].name])
+        self.assertListEqual(list(authors_iterator), [author.name for author in expected_result[:3]])
+
+    def test_execute_lazy(self):
+        prepared_qs = Book.objects.select_related('publisher').filter(pages__gte=BindParam('pages')) \
+            .annotate(authors_count=Count('authors')).prepare()
+        expected_result = list(Book.objects.select_related('publisher').filter(pages__gte=100)
+                               .annotate(authors_count=Count('authors')))
+        results = prepared_qs.execute_lazy(pages=100)
+        self.assertEqual(len(results), 1)
+        self.assertDictEqual(results._instances, {})
+        with self.assertNumQueries(0):
+            book = results[-1]
+            self.assertEqual(book.publisher.name, 'Test Publisher')
+        self.assertIs(results[0], book)
+        self.assertListEqual(list(results), expected_result)
+        self.assertEqual(results[0].authors_count, expected_result[0].authors_count)
+        self.assertEqual(results[0].price, expected_result[0].price)
+        with self.assertRaises(IndexError):
+            results[1]
+        prepared_qs = Author.objects.filter(age=BindParam('age')).values_list('name', flat=True).prepare()
+        self.assertIsInstance(prepared_qs.execute_lazy(age=50), list)
+
+    def test_execute_from_threads(self):
+        names = ['Kazuo Ishiguro', 'Bob Dylan', 'Svetlana Alexievich', 'Patrick Modiano']
+        prepared_qs = Author.objects.filter(name=BindParam('name')).values_list('name', flat=True).prepare()
+        prepared_query = prepared_qs.query
+
+        def execute(name):
+            try:
+                return [prepared_qs.execute(name=name) + list(prepared_qs.execute_iterator(name=name))
+                        for _ in range(20)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(4) as executor:
+            results = list(executor.map(execute, names * 4))
+        self.assertListEqual(results, [[[name, name]] * 20 for name in names * 4])
+        self.assertIs(prepared_qs.query, prepared_query)
+        self.assertDictEqual(prepared_query.prepare_params_values, {})
+
+    def test_execute_buckets_from_threads(self):
+        ids = list(Author.objects.order_by('pk').values_list('pk', flat=True))
+        prepared_qs = Author.objects.filter(pk__in=BindArray('ids', 64, buckets=True)).order_by('pk') \
+            .values_list('pk', flat=True).prepare()
+        array = next(iter(prepared_qs.query.prepare_params_by_hash.values()))
+
+        def execute(size):
+            try:
+                return [prepared_qs.execute(ids=(ids * 64)[:size]) for _ in range(5)]
+            finally:
+                connection.close()
+
+        prepare_sql = PrepareSQLCompiler.prepare_sql
+
+        def slow_prepare_sql(compiler):
+            sleep(0.01)  # Other threads execute statement while bucket is compiled
+            return prepare_sql(compiler)
+
+        sizes = list(range(1, 65))
+        with patch.object(PrepareSQLCompiler, 'prepare_sql', slow_prepare_sql), ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(execute, sizes))
+        self.assertListEqual(results, [[sorted(set((ids * 64)[:size]))] * 5 for size in sizes])
+        self.assertEqual(array.size, 64)
+
+    @skipIf(sync_to_async is None, 'asgiref isn\'t installed')
+    def test_async_execute(self):
+        from asgiref.sync import async_to_sync
+        prepared_qs = Author.objects.filter(age=BindParam('age')).order_by('pk').prepare()
+        expected_result = list(Author.objects.filter(age=50).order_by('pk'))
+
+        async def execute():
+            authors = [author async for author in prepared_qs.aexecute_iterator(chunk_size=3, age=50)]
+            return await prepared_qs.aexecute(age=50), authors, await prepared_qs.aexecute_many([{'age': 50}])
+
+        self.assertEqual(async_to_sync(execute)(), (expected_result, expected_result, [expected_result]))
+
+    def test_execute_many(self):
+        prepared_qs = Author.objects.filter(name=BindParam('name')).prepare()
+        names = ['Bob Dylan', 'Not Exist', 'Svetlana Alexievich']
+        expected_result = [list(Author.objects.filter(name=name)) for name in names]
+        self.assertListEqual(prepared_qs.execute_many([{'name': name} for name in names]), expected_result)
+        self.assertListEqual(prepared_qs.execute_many([]), [])
+        with self.assertRaises(IncorrectBindParameter):
+            prepared_qs.execute_many([{'name': 'Bob Dylan'}, {'wrong_param': 1}])
+
+    def test_execute_many_values_list(self):
+        prepared_qs = Author.objects.filter(age__gte=BindParam('age')).order_by('name').\
+            values_list('name', flat=True).prepare()
+        expected_result = [list(Author.objects.filter(age__gte=age).order_by('name').values_list('name', flat=True))
+                           for age in (50, 51)]
+        self.assertListEqual(prepared_qs.execute_many([{'age': 50}, {'age': 51}]), expected_result)
+
+    def test_values(self):
+        prepared_qs = Author.objects.filter(age__gte=BindParam('age')).order_by('name').values('name', 'age').prepare()
+        expected_result = list(Author.objects.filter(age__gte=50).order_by('name').values('name', 'age'))
+        with patch.object(Author, 'from_db') as from_db, \
+                patch.object(ExecutePreparedSQLCompiler, 'get_converters') as get_converters:
+            self.assertListEqual(prepared_qs.execute(age=50), expected_result)
+            from_db.assert_not_called()
+            get_converters.assert_not_called()
+        prepared_qs = Book.objects.filter(pages__gte=BindParam('pages')).values('publisher__name').\
+            annotate(authors_count=Count('authors')).prepare()
+        self.assertListEqual(prepared_qs.execute(pages=1),
+                             list(Book.objects.filter(pages__gte=1).values('publisher__name').
+                                  annotate(authors_count=Count('authors'))))
+
+    def test_values_list(self):
+        qs = Author.objects.filter(age__gte=50).order_by('name')
+        prepared_qs = Author.objects.filter(age__gte=BindParam('age')).order_by('name')
+        with patch.object(Author, 'from_db') as from_db:
+            self.assertListEqual(prepared_qs.values_list('name', 'age').prepare().execute(age=50),
+                                 list(qs.values_list('name', 'age')))
+            self.assertListEqual(prepared_qs.values_list('name', flat=True).prepare().execute(age=50),
+                                 list(qs.values_list('name', flat=True)))
+            named_result = prepared_qs.values_list('name', 'age', named=True).prepare().execute(age=50)
+            from_db.assert_not_called()
+        self.assertListEqual(named_result, list(qs.values_list('name', 'age', named=True)))
+        self.assertEqual(named_result[0].name, qs.first().name)
+
+    def test_prepare_count(self):
+        prepared_qs = Author.objects.filter(age__gte=BindParam('age'), gender=BindParam('gender')).prepare_count()
+        self.assertEqual(prepared_qs.execute(age=50, gender='m'), Author.objects.filter(age__gte=50, gender='m').count())
+        self.assertEqual(prepared_qs.execute(age=51, gender='m'), 0)
+        self.assertListEqual(prepared_qs.execute_many([{'age': 50, 'gender': 'f'}, {'age': 51, 'gender': 'f'}]), [1, 0])
+        with self.assertRaises(PreparedStatementException):
+            Author.objects.filter(age__gte=BindParam('age')).distinct().prepare_count()
+        with self.assertRaises(OperationOnPreparedStatement):
+            prepared_qs.prepare_count()
+
+    def test_prepare_exists(self):
+        prepared_qs = Author.objects.filter(name=BindParam('name')).prepare_exists()
+        self.assertIs(prepared_qs.execute(name='Bob Dylan'), True)
+        self.assertIs(prepared_qs.execute(name='Not Exist'), False)
+
+    def test_prepare_aggregate(self):
+        prepared_qs = Book.objects.filter(pages__gte=BindParam('pages')).prepare_aggregate(
+            Max('price'), avg_rating=Avg('rating'), authors=Count('authors'))
+        qs = Book.objects.filter(pages__gte=1)
+        self.assertDictEqual(prepared_qs.execute(pages=1),
+                             qs.aggregate(Max('price'), avg_rating=Avg('rating'), authors=Count('authors')))
+        self.assertDictEqual(prepared_qs.execute(pages=1000), {'price__max': None, 'avg_rating': None, 'authors': 0})
+        with self.assertRaises(TypeError):
+            Book.objects.filter(pages__gte=BindParam('pages')).prepare_aggregate(pages=F('pages'))
+        prepared_qs = Book.objects.filter(pages__gte=BindParam('pages')).prepare_aggregate(Max('price'), eager=False)
+        self.assertFalse(prepared_qs._eager)
+        self.assertDictEqual(prepared_qs.execute(pages=1000), {'price__max': None})
+
+    def test_prepare_update(self):
+        prepared_qs = Author.objects.filter(name=BindParam('name')).prepare_update(age=BindParam('age'))
+        self.assertEqual(prepared_qs.execute(name='Bob Dylan', age=60), 1)
+        self.assertEqual(Author.objects.get(name='Bob Dylan').age, 60)
+        self.assertEqual(prepared_qs.execute(name='Not Exist', age=60), 0)
+        self.assertListEqual(prepared_qs.execute_many([{'name': 'Bob Dylan', 'age': 50},
+                                                       {'name': 'Patrick Modiano', 'age': 50}]), [1, 1])
+        self.assertEqual(Author.objects.get(name='Bob Dylan').age, 50)
+        prepared_qs = Author.objects.filter(gender=BindParam('gender')).prepare_update(age=F('age') + 1)
+        self.assertEqual(prepared_qs.execute(gender='m'), 3)
+        self.assertEqual(Author.objects.filter(age=51).count(), 3)
+        Author.objects.update(age=50)
+        with self.assertRaises(PreparedStatementException):
+            Author.objects.filter(books__name=BindParam('name')).prepare_update(age=BindParam('age'))
+        prepared_qs = Author.objects.filter(name=BindParam('name')).prepare_update(age=BindParam('age'), eager=False)
+        self.assertFalse(prepared_qs._eager)
+        self.assertEqual(prepared_qs.execute(name='Bob Dylan', age=50), 1)
+
+    def test_prepare_delete(self):
+        author = Author.objects.create(name='To Delete', age=10, gender='m')
+        with self.assertRaises(PreparedStatementException):
+            Author.objects.filter(pk=BindParam('pk')).prepare_delete()
+        prepared_qs = Author.objects.filter(pk=BindParam('pk')).prepare_delete(raw=True)
+        self.assertEqual(prepared_qs.execute(pk=author.pk), 1)
+        self.assertEqual(prepared_qs.execute(pk=author.pk), 0)
+        self.assertFalse(Author.objects.filter(pk=author.pk).exists())
+        with self.assertRaises(PreparedStatementException):
+            Author.objects.filter(books__name=BindParam('name')).prepare_delete(raw=True)
+        prepared_qs = AllFieldsModel.objects.filter(pk=BindParam('pk')).prepare_delete(eager=False)
+        self.assertFalse(prepared_qs._eager)
+        self.assertEqual(prepared_qs.execute(pk=0), 0)
+
+    def test_prepare_insert(self):
+        prepared_insert = Author.objects.prepare_insert(['name', 'age', 'gender', 'created_at'], batch_size=2)
+        authors = [Author(name='Inserted %d' % i, age=i, gender='m') for i in range(5)]
+        self.assertEqual(prepared_insert.execute(iter(authors)), 5)
+        self.assertListEqual(sorted(prepared_insert._statements), [1, 2])
+        inserted = Author.objects.filter(name__startswith='Inserted').order_by('age')
+        self.assertListEqual([(author.name, author.age) for author in inserted],
+                             [(author.name, author.age) for author in authors])
+        self.assertTrue(all(author.created_at for author in inserted))
+        inserted.delete()
+        if not connection.features.can_return_ids_from_bulk_insert:
+            with self.assertRaises(PreparedStatementException):
+                Author.objects.prepare_insert(['name', 'age', 'gender', 'created_at'], returning=True)
+            return
+        prepared_insert = Author.objects.prepare_insert(['name', 'age', 'gender', 'created_at'], batch_size=2,
+                                                        returning=True)
+        authors = [Author(name='Inserted %d' % i, age=i, gender='f') for i in range(3)]
+        prepared_insert.execute(authors)
+        self.assertListEqual([author.pk for author in authors],
+                             list(Author.objects.filter(name__startswith='Inserted').order_by('age').
+                                  values_list('pk', flat=True)))
+        Author.objects.filter(name__startswith='Inserted').delete()
+
     def test_limit_offset(self):
         prepared_qs = Author.objects.all()[BindParam('start'):BindParam('end')].prepare()
         qs = Author.objects.all()[0:5]
@@ -163,3 +438,121 @@ class PreparedStatementsTestCase(TestCase):
         self.assertListEqual(prepared_qs.execute(start=2), list(qs))
         with self.assertRaises(PreparedStatementException):
             Author.objects.all()[::BindParam('step')].prepare()
+
+    def test_plan_mode(self):
+        if connection.vendor != 'postgresql':
+            with self.assertRaises(PreparedStatementException):
+                Author.objects.filter(age=BindParam('age')).prepare(plan_mode='generic')
+            return
+        with self.assertRaises(PreparedStatementException):
+            Author.objects.filter(age=BindParam('age')).prepare(plan_mode='fast')
+        prepared_qs = Author.objects.filter(age=BindParam('age')).order_by('name').prepare(plan_mode='generic')
+        self.assertListEqual(prepared_qs.execute(age=50), list(Author.objects.filter(age=50).order_by('name')))
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW plan_cache_mode')
+            self.assertEqual(cursor.fetchone()[0], 'force_generic_plan')
+            Author.objects.filter(name=BindParam('name')).prepare().execute(name='Bob Dylan')
+            cursor.execute('SHOW plan_cache_mode')
+            self.assertEqual(cursor.fetchone()[0], 'auto')
+
+    @skipIf(connection.vendor != 'postgresql', 'Plan mode is supported only by PostgreSQL')
+    def test_plan_mode_rollback(self):
+        generic_qs = Author.objects.filter(age=BindParam('age')).prepare(plan_mode='generic')
+        prepared_qs = Author.objects.filter(name=BindParam('name')).prepare()
+        with connection.cursor() as cursor:
+            generic_qs.execute(age=50)
+            try:
+                with transaction.atomic():
+                    prepared_qs.execute(name='Bob Dylan')
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+            cursor.execute('SHOW plan_cache_mode')
+            self.assertEqual(cursor.fetchone()[0], 'force_generic_plan')  # Restored by savepoint rollback
+            prepared_qs.execute(name='Bob Dylan')
+            cursor.execute('SHOW plan_cache_mode')
+            self.assertEqual(cursor.fetchone()[0], 'auto')
+            try:
+                with transaction.atomic():
+                    generic_qs.execute(age=50)
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+            generic_qs.execute(age=50)
+            cursor.execute('SHOW plan_cache_mode')
+            self.assertEqual(cursor.fetchone()[0], 'force_generic_plan')
+
+    def test_warmup(self):
+        if connection.vendor != 'postgresql':
+            with self.assertRaises(PreparedStatementException):
+                Author.objects.filter(age=BindParam('age')).prepare(warmup={'age': 50})
+            return
+        prepared_qs = Author.objects.filter(age__lte=BindParam('age')).order_by('age').prepare(warmup={'age': 50})
+        self.assertListEqual(prepared_qs.execute(age=60), list(Author.objects.filter(age__lte=60).order_by('age')))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT generic_plans + custom_plans FROM pg_prepared_statements WHERE name = %s',
+                           [prepared_qs.query.prepare_statement_name])
+            self.assertEqual(cursor.fetchone()[0], 6)
+
+    def test_explain_execute(self):
+        prepared_qs = Author.objects.filter(age=BindParam('age')).prepare()
+        self.assertIn('test_app_author', prepared_qs.explain_execute(age=50))
+        if connection.vendor != 'postgresql':
+            return
+        self.assertIn('actual time', prepared_qs.explain_execute(analyze=True, age=50))
+        generic_qs = Author.objects.filter(name=BindParam('name')).prepare(plan_mode='generic')
+        self.assertIn('$1', generic_qs.explain_execute(name='Bob Dylan'))
+
+    def test_params_binder(self):
+        prepared_qs = Author.objects.filter(name=BindParam('name'), age__in=BindArray('ages', 3, IntegerField()),
+                                            created_at__date__lt=BindParam('created_at')).prepare()
+        binder = prepared_qs.query.params_binder
+        validators = {name: validator for name, clean, validator in binder.cleaners}
+        self.assertIsNotNone(validators['name'])
+        self.assertIsNone(validators['ages'])  # validation is disabled for user specified field types
+        values = binder.clean({'name': 'Bob Dylan', 'ages': ['50'], 'created_at': date.today()})
+        self.assertEqual(values['ages'], [50])
+        params = binder.bind(values)
+        self.assertEqual(len(params), 5)
+        self.assertIn('Bob Dylan', params)
+        self.assertEqual(params.count(None), 2)
+        with self.assertRaises(IncorrectBindParameter):
+            binder.clean({'name': 'Bob Dylan'})
+
+    def test_execute_metadata_computed_on_prepare(self):
+        prepared_qs = Book.objects.select_related('publisher').filter(pages__gte=BindParam('pages')).\
+            annotate(double_pages=F('pages') * 2).prepare()
+        with patch.object(ExecutePreparedSQLCompiler, 'get_converters') as get_converters, \
+                patch.object(ExecutePreparedSQLCompiler, 'pre_sql_setup') as pre_sql_setup:
+            books = prepared_qs.execute(pages=1)
+            get_converters.assert_not_called()
+            pre_sql_setup.assert_not_called()
+        book = Book.objects.select_related('publisher').get()
+        self.assertListEqual(books, [book])
+        self.assertEqual(books[0].publisher, book.publisher)
+        self.assertEqual(books[0].double_pages, book.pages * 2)
+
+    def test_compiled_statements_cache(self):
+        prepared_qs = Author.objects.filter(name=BindParam('name'), age__gte=BindParam('age')).prepare()
+        with patch.object(PrepareSQLCompiler, 'as_sql') as as_sql:
+            same_prepared_qs = Author.objects.filter(name=BindParam('name'), age__gte=BindParam('age')).prepare()
+            as_sql.assert_not_called()
+        self.assertEqual(same_prepared_qs.query.prepare_statement_name, prepared_qs.query.prepare_statement_name)
+        self.assertListEqual(same_prepared_qs.execute(name='Bob Dylan', age=50),
+                             prepared_qs.execute(name='Bob Dylan', age=50))
+        other_prepared_qs = Author.objects.filter(name=BindParam('name'), age__gte=BindParam('other_age')).prepare()
+        self.assertNotEqual(other_prepared_qs.query.prepare_params_names, prepared_qs.query.prepare_params_names)
+        self.assertListEqual(other_prepared_qs.execute(name='Bob Dylan', other_age=51), [])
+
+    def test_compiled_statements_cache_output_field(self):
+        float_qs = Author.objects.filter(name=BindParam('name')).annotate(x=Cast('age', FloatField())).\
+            values_list('x', flat=True).prepare()
+        char_qs = Author.objects.filter(name=BindParam('name')).annotate(x=Cast('age', CharField(max_length=10))).\
+            values_list('x', flat=True).prepare()
+        self.assertNotEqual(char_qs.query.prepare_statement_name, float_qs.query.prepare_statement_name)
+        self.assertListEqual(float_qs.execute(name='Bob Dylan'), [50.0])
+        self.assertListEqual(char_qs.execute(name='Bob Dylan'), ['50'])
+        int_qs = Author.objects.annotate(x=ExpressionWrapper(F('age') * 2, output_field=IntegerField()))
+        decimal_qs = Author.objects.annotate(
+            x=ExpressionWrapper(F('age') * 2, output_field=DecimalField(max_digits=5, decimal_places=2)))
+        self.assertNotEqual(get_query_fingerprint(decimal_qs.query), get_query_fingerprint(int_qs.query))
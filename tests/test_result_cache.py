@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from time import sleep
+from django.test import TestCase
+from django.db.models.signals import post_save, post_delete
+from test_app.models import Author, Publisher, Book, RequiredArgsBook, BigAutoModel
+from django_prepared_query import BindParam
+from django_prepared_query.result_cache import LocalResultCache
+
+
+class ResultCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Author.objects.create(name='Kazuo Ishiguro', age=50, gender='m')
+        Author.objects.create(name='Bob Dylan', age=60, gender='m')
+        publisher = Publisher.objects.create(name='Test Publisher', num_awards=43)
+        Book.objects.create(name='The Unwomanly Face of War', pages=300, price='200.00', rating=4.65,
+                            publisher=publisher, pubdate=date.today())
+
+    def test_cached_results(self):
+        prepared_qs = Author.objects.filter(age__gte=BindParam('age')).order_by('name').prepare(cache=True)
+        expected_result = list(Author.objects.filter(age__gte=50).order_by('name'))
+        self.assertListEqual(prepared_qs.execute(age=50), expected_result)
+        with self.assertNumQueries(0):
+            self.assertListEqual(prepared_qs.execute(age=50), expected_result)
+        self.assertListEqual(prepared_qs.execute(age=55), expected_result[:1])
+
+    def test_django_cache(self):
+        prepared_qs = Author.objects.filter(age__gte=BindParam('age')).order_by('name') \
+            .values_list('name', flat=True).prepare(cache='default', ttl=60)
+        self.assertListEqual(prepared_qs.execute(age=50), ['Bob Dylan', 'Kazuo Ishiguro'])
+        with self.assertNumQueries(0):
+            self.assertListEqual(prepared_qs.execute(age=50), ['Bob Dylan', 'Kazuo Ishiguro'])
+
+    def test_ttl(self):
+        prepared_qs = Author.objects.filter(age=BindParam('age')).prepare(cache=True, ttl=0)
+        prepared_qs.execute(age=50)
+        with self.assertNumQueries(1):
+            prepared_qs.execute(age=50)
+
+    def test_invalidation(self):
+        prepared_qs = Author.objects.filter(age__gte=BindParam('age')).order_by('name') \
+            .values_list('name', flat=True).prepare(cache=True)
+        self.assertListEqual(prepared_qs.execute(age=50), ['Bob Dylan', 'Kazuo Ishiguro'])
+        author = Author.objects.create(name='Patrick Modiano', age=70, gender='m')
+        self.assertListEqual(prepared_qs.execute(age=50), ['Bob Dylan', 'Kazuo Ishiguro', 'Patrick Modiano'])
+        author.delete()
+        self.assertListEqual(prepared_qs.execute(age=50), ['Bob Dylan', 'Kazuo Ishiguro'])
+
+    def test_related_tables_invalidation(self):
+        prepared_qs = Book.objects.filter(authors__age=BindParam('age')).values_list('name', flat=True) \
+            .prepare(cache=True)
+        self.assertListEqual(prepared_qs.execute(age=50), [])
+        Book.objects.get().authors.add(Author.objects.get(age=50))
+        self.assertListEqual(prepared_qs.execute(age=50), ['The Unwomanly Face of War'])
+
+    def test_receivers_of_cached_tables(self):
+        self.assertFalse(post_delete.has_listeners(BigAutoModel))
+        BigAutoModel.objects.prepare()
+        self.assertFalse(post_delete.has_listeners(BigAutoModel))
+        Book.objects.values_list('name', flat=True).prepare(cache=True)
+        for model in (Book, RequiredArgsBook):
+            self.assertTrue(post_save.has_listeners(model))
+            self.assertTrue(post_delete.has_listeners(model))
+        self.assertFalse(post_delete.has_listeners(BigAutoModel))
+
+    def test_prepared_writes_invalidation(self):
+        prepared_qs = Author.objects.filter(name__startswith=BindParam('name')).order_by('age') \
+            .values_list('age', flat=True).prepare(cache=True)
+        self.assertListEqual(prepared_qs.execute(name='Kazuo'), [50])
+        update_qs = Author.objects.filter(name=BindParam('name')).prepare_update(age=BindParam('age'))
+        update_qs.execute(name='Kazuo Ishiguro', age=99)
+        self.assertListEqual(prepared_qs.execute(name='Kazuo'), [99])
+        prepared_insert = Author.objects.prepare_insert(['name', 'age', 'gender', 'created_at'])
+        prepared_insert.execute([Author(name='Kazuo Ishiguro Jr', age=7, gender='m')])
+        self.assertListEqual(prepared_qs.execute(name='Kazuo'), [7, 99])
+        delete_qs = Author.objects.filter(age=BindParam('age')).prepare_delete(raw=True)
+        delete_qs.execute(age=7)
+        self.assertListEqual(prepared_qs.execute(name='Kazuo'), [99])
+
+    def test_local_result_cache_threads(self):
+        class SlowLocalResultCache(LocalResultCache):
+            # Switching threads around reorder makes eviction of key that is being set or read likely
+            def move_to_end(self, key, last=True):
+                sleep(0.001)
+                super().move_to_end(key, last)
+
+        cache = SlowLocalResultCache(max_size=2)
+
+        def use_cache(thread):
+            for i in range(50):
+                key = (thread + i) % 4
+                if not cache.get_many([key, (key + 1) % 4]):
+                    cache.set(key, key)
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(use_cache, range(8)))
+        self.assertLessEqual(len(cache), 2)
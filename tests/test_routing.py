@@ -0,0 +1,43 @@
+from datetime import date
+from django.test import TransactionTestCase, override_settings
+from django.db import connections
+from test_app.models import Author, Publisher, Book
+from django_prepared_query import BindParam
+from django_prepared_query.statements_pool import statements_pool
+
+
+class RoutingTestCase(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        author = Author.objects.create(name='Kazuo Ishiguro', age=50, gender='m')
+        publisher = Publisher.objects.create(name='Test Publisher', num_awards=43)
+        book = Book.objects.create(name='Never Let Me Go', pages=300, price='200.00', rating=4.65,
+                                   publisher=publisher, pubdate=date.today())
+        book.authors.add(author)
+        connections.close_all()
+        self.addCleanup(connections.close_all)
+
+    def test_using(self):
+        prepared_qs = Author.objects.filter(name=BindParam('name')).prepare(eager=False)
+        name = prepared_qs.query.prepare_statement_name
+        misses = {alias: statements_pool.get_stats(alias)['misses'] for alias in ('default', 'replica')}
+        authors = prepared_qs.using('replica').execute(name='Kazuo Ishiguro')
+        self.assertListEqual([author.name for author in authors], ['Kazuo Ishiguro'])
+        self.assertEqual(authors[0]._state.db, 'replica')
+        self.assertIn(name, statements_pool[connections['replica']])
+        self.assertEqual(statements_pool.get_stats('replica')['misses'] - misses['replica'], 1)
+        self.assertEqual(statements_pool.get_stats('default')['misses'] - misses['default'], 0)
+
+    @override_settings(PREPARED_STATEMENTS_REPLICAS=['default', 'replica'],
+                       DATABASE_ROUTERS=['django_prepared_query.routers.ReplicasRouter'])
+    def test_replicas_router(self):
+        prepared_qs = Author.objects.filter(age=BindParam('age')).prefetch_related('books').prepare(eager=False)
+        name = prepared_qs.query.prepare_statement_name
+        authors = [prepared_qs.execute(age=50)[0] for _ in range(4)]
+        self.assertListEqual(sorted(author._state.db for author in authors),
+                             ['default', 'default', 'replica', 'replica'])
+        for author in authors:
+            self.assertListEqual([book._state.db for book in author.books.all()], [author._state.db])
+        for alias in ('default', 'replica'):
+            self.assertIn(name, statements_pool[connections[alias]])
@@ -86,8 +86,10 @@ class PreparedStatementsTestCase(TestCase):
             self.prepared_qs.only('name')
 
     def test_using_on_prepared_statement(self):
-        with self.assertRaises(OperationOnPreparedStatement):
-            self.prepared_qs.using('default')
+        prepared_qs = self.prepared_qs.using('default')
+        self.assertTrue(prepared_qs.prepared)
+        self.assertEqual(prepared_qs.db, 'default')
+        self.assertIs(prepared_qs.query, self.prepared_qs.query)
 
     def test_iterator_on_prepared_statement(self):
         with self.assertRaises(OperationOnPreparedStatement):
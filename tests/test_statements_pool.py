@@ -1,12 +1,22 @@
-from django.test import TransactionTestCase
-from django.db import connections
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from unittest import skipUnless
+from django.test import TransactionTestCase, override_settings
+from django.db import connection, connections, DEFAULT_DB_ALIAS
 from test_app.models import Book
-from django_prepared_query.statements_pool import statements_pool
+from django_prepared_query import BindParam
+from django_prepared_query.operations import PreparedOperationsFactory
+from django_prepared_query.statements_pool import statements_pool, CompiledStatementsCache
+
+
+server_prepare_only = skipUnless(PreparedOperationsFactory.create(connection.vendor).has_server_prepare(),
+                                 'Statements are prepared on the server only')
 
 
 class StatementsPoolTestCase(TransactionTestCase):
+    @server_prepare_only
     def test_query_after_connection_close(self):
-        prepared_qs = Book.objects.prepare()
+        prepared_qs = Book.objects.prepare(eager=False)
         with self.assertNumQueries(2):  # Prepare and execute
             prepared_qs.execute()
         with self.assertNumQueries(1):  # Execute
@@ -15,9 +25,64 @@ class StatementsPoolTestCase(TransactionTestCase):
         with self.assertNumQueries(2):  # Prepare and execute
             prepared_qs.execute()
 
+    @server_prepare_only
     def test_statements_pool_clear(self):
         prepared_qs = Book.objects.prepare()
         prepared_qs.execute()
         self.assertEqual(len(statements_pool), 1)
         connections.close_all()
         self.assertEqual(len(statements_pool), 0)
+
+    @server_prepare_only
+    def test_prepare_on_connection_creation(self):
+        prepared_qs = Book.objects.prepare()
+        not_eager_prepared_qs = Book.objects.filter(id=BindParam('id')).prepare(eager=False)
+        connections.close_all()
+        connection = connections[DEFAULT_DB_ALIAS]
+        connection.ensure_connection()
+        self.assertIn(prepared_qs.query.prepare_statement_name, statements_pool[connection])
+        self.assertNotIn(not_eager_prepared_qs.query.prepare_statement_name, statements_pool[connection])
+        with self.assertNumQueries(1):  # Execute
+            prepared_qs.execute()
+
+    @override_settings(PREPARED_STATEMENTS_POOL_SIZE=2)
+    def test_statements_pool_eviction(self):
+        prepared_querysets = [Book.objects.filter(pages__gte=BindParam('pages')).prepare(eager=False),
+                              Book.objects.filter(pages__lte=BindParam('pages')).prepare(eager=False),
+                              Book.objects.filter(pages=BindParam('pages')).prepare(eager=False)]
+        names = [prepared_qs.query.prepare_statement_name for prepared_qs in prepared_querysets]
+        connection = connections[DEFAULT_DB_ALIAS]
+        connection.ensure_connection()
+        statements = statements_pool[connection]
+        hits, misses, evictions = statements.hits, statements.misses, statements.evictions
+        for prepared_qs in prepared_querysets:
+            prepared_qs.execute(pages=100)
+        self.assertListEqual(list(statements), names[1:])
+        self.assertEqual(statements.misses - misses, 3)
+        prepared_querysets[1].execute(pages=100)
+        self.assertEqual(statements.hits - hits, 1)
+        prepared_querysets[0].execute(pages=100)  # Evicted statement must be prepared again
+        self.assertListEqual(list(statements), [names[1], names[0]])
+        self.assertEqual(statements.misses - misses, 4)
+        self.assertGreaterEqual(statements.evictions - evictions, 2)
+
+    def test_compiled_statements_cache_threads(self):
+        class SlowCompiledStatementsCache(CompiledStatementsCache):
+            # Switching threads after reorder makes eviction of key before it's read likely
+            def move_to_end(self, key, last=True):
+                super().move_to_end(key, last)
+                sleep(0.001)
+
+        cache = SlowCompiledStatementsCache(max_size=2)
+
+        def use_cache(thread):
+            for i in range(50):
+                key = (thread + i) % 4
+                if cache.get(key) is None:
+                    cache.set(key, key)
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(use_cache, range(8)))
+        self.assertLessEqual(len(cache), 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)